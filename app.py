@@ -8,7 +8,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from src.utils.stats_utils import refresh_invoice_counts
+from src.utils.stats_utils import init as init_report_dirs, refresh_invoice_counts
 
 # Page config
 st.set_page_config(
@@ -18,6 +18,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Report directories are created once per process, not on every count
+init_report_dirs()
+
 # Initialize session state
 if "invoices_data" not in st.session_state:
     st.session_state.invoices_data = refresh_invoice_counts()
@@ -69,22 +72,22 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric(
         label="📥 Total Invoices",
-        value=data["total_received"],
+        value=data.total_received,
         help="Total number of invoices received"
     )
 
 with col2:
     st.metric(
         label="✅ Successfully Processed",
-        value=data["successfully_processed"],
-        delta=f"{data['auto_processing_rate']:.1f}% auto",
+        value=data.successfully_processed,
+        delta=f"{data.auto_processing_rate:.1f}% auto",
         help="Invoices that passed validation"
     )
 
 with col3:
     st.metric(
         label="⏳ Pending Review",
-        value=data["pending_review"],
+        value=data.pending_review,
         delta_color="inverse",
         help="Invoices awaiting human review"
     )
@@ -92,7 +95,7 @@ with col3:
 with col4:
     st.metric(
         label="❌ Rejected",
-        value=data["rejected"],
+        value=data.rejected,
         delta_color="inverse",
         help="Invoices that were rejected"
     )
@@ -104,39 +107,39 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("#### 📈 Acceptance Rate")
-    acceptance_rate = min(data["acceptance_rate"] / 100, 1.0)
+    acceptance_rate = min(data.acceptance_rate / 100, 1.0)
     st.progress(acceptance_rate)
     
     # Color-coded status
-    if data["acceptance_rate"] >= 90:
+    if data.acceptance_rate >= 90:
         status_color = "🟢"
         status_text = "Excellent"
-    elif data["acceptance_rate"] >= 75:
+    elif data.acceptance_rate >= 75:
         status_color = "🟡"
         status_text = "Good"
     else:
         status_color = "🔴"
         status_text = "Needs Attention"
     
-    st.markdown(f"**{data['acceptance_rate']:.1f}%** of invoices accepted {status_color} *{status_text}*")
+    st.markdown(f"**{data.acceptance_rate:.1f}%** of invoices accepted {status_color} *{status_text}*")
 
 with col2:
     st.markdown("#### ⚡ Automatic Processing Rate")
-    auto_rate = min(data["auto_processing_rate"] / 100, 1.0)
+    auto_rate = min(data.auto_processing_rate / 100, 1.0)
     st.progress(auto_rate)
     
     # Color-coded status
-    if data["auto_processing_rate"] >= 80:
+    if data.auto_processing_rate >= 80:
         status_color = "🟢"
         status_text = "Excellent"
-    elif data["auto_processing_rate"] >= 60:
+    elif data.auto_processing_rate >= 60:
         status_color = "🟡"
         status_text = "Good"
     else:
         status_color = "🔴"
         status_text = "Needs Attention"
     
-    st.markdown(f"**{data['auto_processing_rate']:.1f}%** processed automatically {status_color} *{status_text}*")
+    st.markdown(f"**{data.auto_processing_rate:.1f}%** processed automatically {status_color} *{status_text}*")
 
 st.divider()
 
@@ -144,10 +147,10 @@ st.divider()
 st.markdown("#### 📊 Invoice Status Distribution")
 
 status_data = {
-    "Auto-Processed": data["auto_processed"],
-    "Pending Review": data["pending_review"],
-    "Approved": data["approved"],
-    "Rejected": data["rejected"]
+    "Auto-Processed": data.auto_processed,
+    "Pending Review": data.pending_review,
+    "Approved": data.approved,
+    "Rejected": data.rejected
 }
 
 col1, col2 = st.columns([2, 1])
@@ -159,7 +162,7 @@ with col2:
     st.markdown("##### Status Breakdown")
     for status, count in status_data.items():
         if count > 0:
-            percentage = (count / data["total_received"] * 100) if data["total_received"] > 0 else 0
+            percentage = (count / data.total_received * 100) if data.total_received > 0 else 0
             st.metric(status, count, f"{percentage:.1f}%")
 
 st.divider()
@@ -169,7 +172,7 @@ st.markdown("#### ⚡ Quick Actions")
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    if data["pending_review"] > 0:
+    if data.pending_review > 0:
         if st.button("🔍 Review Pending Invoices", use_container_width=True, type="primary"):
             st.switch_page("pages/2_🔍_Review_Queue.py")
     else:
@@ -23,6 +23,14 @@ SKU_MASTER_FILE = MOCK_ERP_DIR / "sku_master.json"
 
 # RAG data
 VECTOR_STORE_DIR = DATA_DIR / "vector_store"
+# Index layout: exact inner-product search on normalized vectors (cosine);
+# above FAISS_IVF_THRESHOLD vectors the index is rebuilt as IVF (approximate)
+FAISS_IVF_THRESHOLD = 10_000
+FAISS_IVF_NPROBE = 8
+# Store IVF vectors as int8 (IndexIVFScalarQuantizer): ~4x less memory, small recall cost
+FAISS_IVF_INT8 = True
+# Full report/metadata JSON per indexed invoice (kept out of the FAISS docstore)
+REPORTS_DB_PATH = VECTOR_STORE_DIR / "reports.sqlite"
 
 # Report Paths
 REPORTS_DIR = BASE_DIR / "reports"
@@ -42,6 +50,19 @@ LLM_TRANSLATION_MODEL = "bedrock/cohere.command-r-plus-v1:0"
 LLM_RAG_MODEL = "bedrock/cohere.command-r-plus-v1:0"
 LLM_EMBEDDING_MODEL = "bedrock/amazon.titan-embed-text-v1" 
 
+# Embedding batching: texts per request and max requests in flight
+EMBEDDING_BATCH_SIZE = 96
+EMBEDDING_MAX_CONCURRENCY = 4
+
+# Retries for throttled Bedrock calls
+LLM_MAX_RETRIES = 5
+
+# Validation results memoized by invoice content + rules hash, so retries of
+# the same payload skip the ERP and LLM calls
+VALIDATION_CACHE_DIR = VECTOR_STORE_DIR / "validation_cache"
+VALIDATION_CACHE_SIZE_LIMIT = 2 << 30  # bytes
+VALIDATION_CACHE_TTL = 24 * 60 * 60  # seconds; bounds staleness vs. ERP data changes
+
 # --- FastAPI ERP Server (US-6) ---
 ERP_HOST = "127.0.0.1"
 ERP_PORT = 8000
@@ -59,6 +80,10 @@ TRANSLATION_FIELDS = {
         "description"
     ]
 }
+
+# Translate non-English invoices inside the extraction call instead of
+# one LLM call per field in the translation agent
+FUSE_EXTRACTION_AND_TRANSLATION = True
 # ---------------------------------------------------------
 
 
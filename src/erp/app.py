@@ -1,5 +1,5 @@
 from fastapi import FastAPI, HTTPException
-from typing import Optional
+from typing import List, Optional
 import sys
 import os
  
@@ -62,6 +62,15 @@ async def get_po_by_number(po_number: str):
         raise HTTPException(status_code=404, detail=f"PO Number '{po_number}' not found.")
     return po
  
+@app.get("/sku", response_model=List[Sku], summary="Get SKUs by Item Codes")
+async def get_skus_by_codes(codes: str = ""):
+    """
+    Retrieves several SKUs in one call.
+    `codes` is a comma-separated list; codes not in the ERP are omitted from the result.
+    """
+    item_codes = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    return db.get_skus_by_codes(item_codes)
+ 
 @app.get("/sku/{item_code}", response_model=Sku, summary="Get SKU by Item Code")
 async def get_sku_by_code(item_code: str):
     """Retrieves a single SKU (item) by its item code."""
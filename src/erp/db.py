@@ -86,6 +86,12 @@ class MockERPDatabase:
  
     def get_sku_by_code(self, item_code: str) -> Optional[Sku]:
         return self.skus.get(item_code)
+
+    def get_skus_by_codes(self, item_codes: List[str]) -> List[Sku]:
+        """
+        Returns the SKUs that exist for the given item codes (unknown codes are skipped).
+        """
+        return [self.skus[code] for code in item_codes if code in self.skus]
  
 # Single instance to be shared by the FastAPI app
 try:
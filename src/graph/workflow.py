@@ -81,7 +81,9 @@ def extraction_node(state: InvoiceState) -> Dict[str, Any]:
     try:
         filepath = state['filepath']
         print(f"[Graph] Processing: {os.path.basename(filepath)}")
-        extracted_data = extract_invoice_data(filepath)
+        metadata = read_metadata_file(filepath)
+        language = metadata.get("language", "en") if metadata else "en"
+        extracted_data = extract_invoice_data(filepath, language_code=language)
         
         if not extracted_data or "error" in extracted_data:
             error_msg = extracted_data.get("error", "Unknown extraction error")
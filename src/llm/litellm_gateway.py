@@ -1,9 +1,14 @@
 import os
 import sys
-from typing import Dict, Any, List, Literal
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Literal, Optional
 import json
+import re
 import traceback 
-from pydantic import BaseModel, Field
+import orjson
+import msgspec
+from pydantic import BaseModel, Field, ValidationError
 # from langchain_core.output_parsers import PydanticOutputParser
 # --- Add project root to path ---
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -14,12 +19,20 @@ try:
     import litellm
     from litellm import completion, embedding
     import boto3
-    from config.settings import LLM_EMBEDDING_MODEL, LLM_RAG_MODEL
+    from tenacity import (
+        Retrying, stop_after_attempt,
+        wait_random_exponential, retry_if_exception_type
+    )
+    from config.settings import (
+        LLM_EMBEDDING_MODEL, LLM_RAG_MODEL,
+        EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CONCURRENCY,
+        LLM_MAX_RETRIES, TRANSLATION_FIELDS
+    )
 
 except ImportError as e:
     print("="*50)
     print(f"ERROR: Missing dependency: {e}")
-    print("Please run: pip install litellm boto3")
+    print("Please run: pip install litellm boto3 tenacity")
     print("="*50)
     sys.exit(1)
 
@@ -61,9 +74,32 @@ def setup_aws_credentials():
         print("Make sure you've run: aws configure")
         return False
 
-if not setup_aws_credentials():
-    print("\n⚠️  WARNING: AWS credentials not configured properly!")
-    print("The LLMGateway will fail when making Bedrock calls.\n")
+@functools.cache
+def _ensure_aws() -> bool:
+    """
+    Makes sure AWS credentials are available, once per process.
+    Credentials already in the environment are used as-is; boto3 is only
+    consulted when they are missing.
+    """
+    if os.getenv("AWS_ACCESS_KEY_ID"):
+        return True
+    if not setup_aws_credentials():
+        print("\n⚠️  WARNING: AWS credentials not configured properly!")
+        print("The LLMGateway will fail when making Bedrock calls.\n")
+        return False
+    return True
+
+# --- Retry / rate limiting for Bedrock calls ---
+# Only throttling errors are retried; anything else is surfaced immediately.
+_RETRY_KWARGS = dict(
+    stop=stop_after_attempt(LLM_MAX_RETRIES),
+    wait=wait_random_exponential(multiplier=0.5, max=8),
+    retry=retry_if_exception_type(litellm.RateLimitError),
+    reraise=True
+)
+
+# Embedding batches run here, using the sync litellm client
+_EMBEDDING_EXECUTOR = ThreadPoolExecutor(max_workers=EMBEDDING_MAX_CONCURRENCY, thread_name_prefix="embedding")
 
 # --- Internal Pydantic model for the AI Analysis output ---
 class AIAnalysis(BaseModel):
@@ -84,6 +120,12 @@ class AIAnalysis(BaseModel):
         description="The system's final recommendation: APPROVE (no issues), REJECT (critical issues), or REVIEW (minor issues/warnings)."
     )
 
+# Markdown code fence around LLM output, with optional "json" tag
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+# Schema text embedded in the analysis prompt (static, so built once)
+_AI_ANALYSIS_SCHEMA_JSON = json.dumps(AIAnalysis.model_json_schema(), indent=2)
+
 class LLMGateway:
     """
     A centralized gateway for all LLM calls, powered by LiteLLM.
@@ -94,7 +136,7 @@ class LLMGateway:
         self.model = model
         print(f"[LLMGateway] Initialized with model: {self.model}")
     
-        if not os.getenv("AWS_ACCESS_KEY_ID"):
+        if not _ensure_aws():
             raise ValueError("AWS credentials not found.")
         
         litellm.set_verbose = False
@@ -106,49 +148,69 @@ class LLMGateway:
         """
         try:
             fallback_models = ["bedrock/amazon.nova-lite-v1:0"]
-        
-            response = completion(
-                model=self.model, 
-                fallbacks=fallback_models,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                response_format=response_format
-            )
+
+            for attempt in Retrying(**_RETRY_KWARGS):
+                with attempt:
+                    response = completion(
+                        model=self.model, 
+                        fallbacks=fallback_models,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        response_format=response_format
+                    )
             return response.choices[0].message.content.strip()
         except Exception as e:
-            error_msg = str(e)
-            print(f"[LLMGateway] LLM call failed: {error_msg}")
-            traceback.print_exc()
-            if "BadRequestError" in error_msg:
-                print("[LLMGateway] Try a different Bedrock model")
-            elif "Authentication" in error_msg or "credentials" in error_msg.lower():
-                print("[LLMGateway] AWS credentials invalid. Run: aws configure")
-            elif "throttl" in error_msg.lower():
-                print("[LLMGateway] Rate limit hit. Wait and retry.")            
+            self._report_llm_error(e)
             raise
 
+    def _report_llm_error(self, e: Exception):
+        error_msg = str(e)
+        print(f"[LLMGateway] LLM call failed: {error_msg}")
+        traceback.print_exc()
+        if "BadRequestError" in error_msg:
+            print("[LLMGateway] Try a different Bedrock model")
+        elif "Authentication" in error_msg or "credentials" in error_msg.lower():
+            print("[LLMGateway] AWS credentials invalid. Run: aws configure")
+        elif "throttl" in error_msg.lower():
+            print(f"[LLMGateway] Rate limit still hit after {LLM_MAX_RETRIES} attempts.")
+
     def call_for_structured_extraction(
         self, 
         invoice_text: str, 
         pydantic_schema: BaseModel,
-        original_filename: str
+        original_filename: str,
+        source_language: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Extracts structured data from invoice text using LLM with robust JSON parsing.
+
+        If source_language is given (non-English invoice), the translatable
+        fields are translated to English in the same call, replacing the
+        per-field translation round-trips.
         
         Args:
             invoice_text: The extracted text from the invoice file
             pydantic_schema: The Pydantic model to validate against (e.g., InvoiceData)
             original_filename: The name of the source file
+            source_language: Language code of the invoice to translate from, or None
             
         Returns:
-            Dictionary containing validated invoice data or error message
+            Dictionary containing validated invoice data or error message.
+            Includes "translation_confidence" when source_language was given and
+            the model returned a numeric confidence.
         """
         if not invoice_text:
             return {"error": "Empty content after text extraction"}
         # Get the full schema
         schema_json = json.dumps(pydantic_schema.model_json_schema(), indent=2)
+        translation_instructions = ""
+        if source_language:
+            header_fields = ", ".join(f'"{f}"' for f in TRANSLATION_FIELDS.get("header", []))
+            item_fields = ", ".join(f'"{f}"' for f in TRANSLATION_FIELDS.get("line_item", []))
+            translation_instructions = f"""
+8. The invoice is in language "{source_language}". Translate the values of {header_fields} and line item {item_fields} to English. Keep IDs, numbers, dates and currency codes unchanged
+9. Add a top-level "translation_confidence" field: a number between 0 and 1 reflecting your certainty the translation preserves meaning"""
         messages = [
             {
                 "role": "system",
@@ -165,7 +227,7 @@ CRITICAL INSTRUCTIONS:
 4. Date format: YYYY-MM-DD (e.g., "2025-11-07")
 5. Numbers: Remove currency symbols (use 2100.50 not "$2,100.50")
 6. Currency: Use 3-letter code (USD, EUR, GBP, etc.)
-7. Line items: Extract ALL items with their details
+7. Line items: Extract ALL items with their details{translation_instructions}
 
 Example of correct output structure:
 {{
@@ -199,8 +261,8 @@ Example of correct output structure:
         
         print(f"[LLMGateway] Extracting data from: {original_filename}")
         try:
-            # Call the LLM
-            content = self._call_llm(
+            # Call the LLM in JSON mode
+            content = self._call_llm_json(
                 messages, 
                 temperature=0.1, 
                 max_tokens=2000
@@ -208,19 +270,32 @@ Example of correct output structure:
             
             print(f"[LLMGateway] Raw LLM response length: {len(content)} chars")
             
-            # Extract JSON from response (handles markdown, extra text, etc.)
-            structured_data = self._extract_json_from_text(content)
+            structured_data = self._parse_json_response(content)
+            translation_conf = structured_data.pop("translation_confidence", None)
      
             # This ensures these fields are present when Pydantic validates
             structured_data["original_filename"] = original_filename
             structured_data["processing_status"] = "Extracted"
             
-            # Validate the complete data with Pydantic
-            validated = pydantic_schema.model_validate(structured_data)
+            raw = orjson.dumps(structured_data)
+            struct_type = getattr(pydantic_schema, "struct_type", None)
+            if struct_type is not None:
+                # Decode + type-check with the msgspec mirror; to_builtins
+                # serializes dates to ISO strings like model_dump(mode='json')
+                result = msgspec.to_builtins(msgspec.json.decode(raw, type=struct_type, strict=False))
+            else:
+                # Validate the complete data with Pydantic (parse + validate in one pass)
+                result = pydantic_schema.model_validate_json(raw).model_dump(mode='json')
             
             print(f"[LLMGateway] ✓ Extraction successful")
-            # Convert to dict with proper serialization (dates -> strings)
-            return validated.model_dump(mode='json')
+            if source_language:
+                if isinstance(translation_conf, (int, float)) and not isinstance(translation_conf, bool):
+                    result["translation_confidence"] = max(0.0, min(1.0, float(translation_conf)))
+                    print(f"[LLMGateway] ✓ Translated from '{source_language}' during extraction")
+                else:
+                    # No usable confidence: leave translation to the translation agent
+                    print(f"[LLMGateway] ⚠ No translation confidence returned for '{source_language}'")
+            return result
             
         except json.JSONDecodeError as e:
             print(f"[LLMGateway] ✗ JSON parse error: {e}")
@@ -232,6 +307,36 @@ Example of correct output structure:
             traceback.print_exc()
             return {"error": f"Extraction failed: {str(e)}"}
     
+    def _call_llm_json(self, messages: List[Dict[str, str]], temperature: float = 0.3,
+                       max_tokens: int = 2000) -> str:
+        """
+        Calls the LLM in native JSON mode.
+        Falls back to a plain call if the model rejects response_format.
+        """
+        try:
+            return self._call_llm(
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"}
+            )
+        except litellm.BadRequestError:
+            print("[LLMGateway] JSON mode not supported by model, retrying without it")
+            return self._call_llm(messages, temperature=temperature, max_tokens=max_tokens)
+
+    def _parse_json_response(self, content: str) -> Dict[str, Any]:
+        """
+        Parses a JSON-mode response directly.
+        Falls back to _extract_json_from_text for fenced or wrapped output.
+        """
+        try:
+            parsed = orjson.loads(content)
+            if isinstance(parsed, dict):
+                return parsed
+        except orjson.JSONDecodeError:
+            pass
+        return self._extract_json_from_text(content)
+
     def _extract_json_from_text(self, content: str) -> Dict[str, Any]:
         """
         Robust JSON extraction that handles:
@@ -248,21 +353,11 @@ Example of correct output structure:
         original_content = content
         content = content.strip()
         
-        # Remove markdown code blocks if present
-        if "```json" in content.lower():
-            # Handle ```json ... ```
-            start = content.lower().find("```json") + 7
-            end = content.find("```", start)
-            if end > start:
-                content = content[start:end].strip()
-                print(f"[LLMGateway] Extracted from ```json``` block")
-        elif "```" in content:
-            # Handle ``` ... ``` (generic code block)
-            start = content.find("```") + 3
-            end = content.find("```", start)
-            if end > start:
-                content = content[start:end].strip()
-                print(f"[LLMGateway] Extracted from ``` ``` block")
+        # Remove markdown code blocks if present (```json ... ``` or ``` ... ```)
+        match = _FENCE_RE.search(content)
+        if match:
+            content = match.group(1).strip()
+            print(f"[LLMGateway] Extracted from ``` ``` block")
         
         # Find JSON object boundaries
         start_idx = content.find('{')
@@ -302,7 +397,18 @@ Example of correct output structure:
         """
         if not text_to_translate or not isinstance(text_to_translate, str):
             return {"text": text_to_translate, "confidence": None}
-        messages = [
+        messages = self._translation_messages(text_to_translate)
+
+        print(f"[LLMGateway] Translating text...")
+        try:
+            content = self._call_llm(messages, temperature=0.1, max_tokens=500)
+            return self._parse_translation(content, text_to_translate)
+        except Exception as e:
+            print(f"[LLMGateway] ✗ Translation failed: {e}")
+            return {"text": text_to_translate, "confidence": None}
+
+    def _translation_messages(self, text_to_translate: str) -> List[Dict[str, str]]:
+        return [
             {
                 "role": "system",
                 "content": (
@@ -318,34 +424,28 @@ Example of correct output structure:
             {"role": "user", "content": text_to_translate},
         ]
 
-        print(f"[LLMGateway] Translating text...")
+    def _parse_translation(self, content: str, text_to_translate: str) -> Dict[str, Any]:
+        #parse JSON; if the model returned raw text, treat it as text with None confidence
         try:
-            content = self._call_llm(messages, temperature=0.1, max_tokens=500)
-            #parse JSON; if the model returned raw text, treat it as text with None confidence
-            try:
-                parsed = self._extract_json_from_text(content)
-                text = parsed.get("text", "")
-                conf = parsed.get("confidence", None)
-                if isinstance(conf, (int, float)):
-                    conf = max(0.0, min(1.0, float(conf)))
-                else:
-                    conf = None
-                # fallback
-                if not isinstance(text, str) or not text.strip():
-                    text = text_to_translate
-
-                print(f"[LLMGateway] ✓ Translation successful")
-                return {"text": text, "confidence": conf}
+            parsed = self._extract_json_from_text(content)
+            text = parsed.get("text", "")
+            conf = parsed.get("confidence", None)
+            if isinstance(conf, (int, float)):
+                conf = max(0.0, min(1.0, float(conf)))
+            else:
+                conf = None
+            # fallback
+            if not isinstance(text, str) or not text.strip():
+                text = text_to_translate
 
-            except Exception:
-                # Model didn't return JSON; treat output as the translated text
-                translated = content.strip() if isinstance(content, str) else text_to_translate
-                print(f"[LLMGateway] ✓ Translation parsed as plain text (no JSON).")
-                return {"text": translated, "confidence": None}
+            print(f"[LLMGateway] ✓ Translation successful")
+            return {"text": text, "confidence": conf}
 
-        except Exception as e:
-            print(f"[LLMGateway] ✗ Translation failed: {e}")
-            return {"text": text_to_translate, "confidence": None}
+        except Exception:
+            # Model didn't return JSON; treat output as the translated text
+            translated = content.strip() if isinstance(content, str) else text_to_translate
+            print(f"[LLMGateway] ✓ Translation parsed as plain text (no JSON).")
+            return {"text": translated, "confidence": None}
 
         
     def get_embedding(self, text: str) -> List[float]:
@@ -360,6 +460,49 @@ Example of correct output structure:
         except Exception as e:
             print(f"[LLMGateway] ✗ Embedding failed: {e}")
             return []
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generates embeddings for a list of texts in a single request.
+        """
+        if not texts:
+            return []
+        print(f"[LLMGateway] Generating {len(texts)} embeddings...")
+        try:
+            response = embedding(model=LLM_EMBEDDING_MODEL, input=texts)
+            print(f"[LLMGateway] ✓ Batch embedding successful")
+            return [d['embedding'] for d in response.data]
+        except Exception as e:
+            print(f"[LLMGateway] ✗ Batch embedding failed: {e}")
+            return []
+
+    def get_embeddings_chunked(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+        """
+        Splits texts into batches and embeds them concurrently on a thread pool
+        (at most EMBEDDING_MAX_CONCURRENCY requests in flight). Uses the sync
+        client, so nothing is tied to a short-lived event loop.
+        Results keep the same order as the input texts; [] if any text fails.
+        """
+        if not texts:
+            return []
+
+        def _embed_batch(offset: int) -> List[List[float]]:
+            batch = texts[offset:offset + batch_size]
+            vectors = self.get_embeddings(batch)
+            if len(vectors) != len(batch):
+                # One bad input shouldn't sink the whole batch
+                print(f"[LLMGateway] Batch of {len(batch)} failed, retrying per text...")
+                vectors = [self.get_embedding(text) for text in batch]
+            return vectors
+
+        offsets = range(0, len(texts), batch_size)
+        print(f"[LLMGateway] Embedding {len(texts)} texts in {len(offsets)} batches...")
+        vectors = [v for chunk in _EMBEDDING_EXECUTOR.map(_embed_batch, offsets) for v in chunk]
+        if not all(vectors):
+            print(f"[LLMGateway] ✗ Batch embedding failed")
+            return []
+        print(f"[LLMGateway] ✓ Batch embedding successful")
+        return vectors
  
     def generate_ai_analysis(self,invoice_data: Dict[str, Any],validation_results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -371,25 +514,26 @@ Example of correct output structure:
         Returns:
             Dictionary matching AIAnalysis schema or an error dictionary
         """
-        schema_json = json.dumps(AIAnalysis.model_json_schema(), indent=2)
+        schema_json = _AI_ANALYSIS_SCHEMA_JSON
 
-        failed = [r for r in validation_results if r.get('status') == 'FAILED']
-        warnings = [r for r in validation_results if r.get('status') == 'WARNING']
-        
-        failed_checks_json = json.dumps(
-            [{'rule': r.get('rule_name'), 'issue': r.get('message')} for r in failed],
-            indent=2
-        )
-        warning_checks_json = json.dumps(
-            [{'rule': r.get('rule_name'), 'issue': r.get('message')} for r in warnings],
-            indent=2
-        )
-        invoice_summary = json.dumps({
+        # Single pass over the rule results
+        failed, warnings = [], []
+        for r in validation_results:
+            status = r.get('status')
+            if status == 'FAILED':
+                failed.append({'rule': r.get('rule_name'), 'issue': r.get('message')})
+            elif status == 'WARNING':
+                warnings.append({'rule': r.get('rule_name'), 'issue': r.get('message')})
+
+        # Compact JSON: the model doesn't need pretty-printing
+        failed_checks_json = orjson.dumps(failed).decode()
+        warning_checks_json = orjson.dumps(warnings).decode()
+        invoice_summary = orjson.dumps({
             "vendor": invoice_data.get('vendor_name'),
             "total": invoice_data.get('total_amount'),
             "invoice_date": invoice_data.get('invoice_date'),
             "po_number": invoice_data.get('po_number')
-        }, indent=2)
+        }).decode()
 
         prompt = f"""You are an expert financial auditor. Your job is to analyze an invoice audit and provide a structured JSON response.
 Here is the invoice summary:
@@ -421,16 +565,18 @@ SCHEMA:
         ]
         print("[LLMGateway] Generating structured AI analysis...")
         try:
-            content = self._call_llm(
+            content = self._call_llm_json(
                 messages,
                 temperature=0.1,
                 max_tokens=1500 
             )
             print(f"[LLMGateway] Raw AI analysis response length: {len(content)} chars")
-            # Use the robust JSON extraction method
-            structured_data = self._extract_json_from_text(content)
-            # Validate with Pydantic
-            validated_data = AIAnalysis.model_validate(structured_data)
+            try:
+                # Clean JSON-mode output: parse + validate in one pass
+                validated_data = AIAnalysis.model_validate_json(content)
+            except ValidationError:
+                structured_data = self._parse_json_response(content)
+                validated_data = AIAnalysis.model_validate(structured_data)
             
             print("[LLMGateway] ✓ AI analysis generated and validated.")
             return validated_data.model_dump()
@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if project_root not in sys.path:
@@ -9,7 +9,7 @@ if project_root not in sys.path:
 try:
     from src.llm.litellm_gateway import LLMGateway
     from src.models.invoice import InvoiceData
-    from config.settings import LLM_EXTRACTION_MODEL
+    from config.settings import LLM_EXTRACTION_MODEL, FUSE_EXTRACTION_AND_TRANSLATION
     from src.utils.file_utils import get_file_content
 
 except ImportError as e:
@@ -20,13 +20,16 @@ except ImportError as e:
 # Initialize our LLM Gateway
 llm_gateway = LLMGateway(model=LLM_EXTRACTION_MODEL)
 
-def extract_invoice_data(filepath: str) -> Dict[str, Any]:
+def extract_invoice_data(filepath: str, language_code: Optional[str] = None) -> Dict[str, Any]:
     """
     Orchestrates the extraction of structured data from an invoice file.
     This is the simplified "text-only" pipeline.
+    Non-English invoices are translated in the same LLM call when
+    FUSE_EXTRACTION_AND_TRANSLATION is enabled.
     
     Args:
         filepath: The full path to the invoice file.
+        language_code: Language of the invoice (from its metadata), if known.
         
     Returns:
         A dictionary containing the structured invoice data or an error message.
@@ -43,12 +46,17 @@ def extract_invoice_data(filepath: str) -> Dict[str, Any]:
     
     print(f"[ExtractionAgent] Extracted {len(invoice_text)} characters of text")
     
+    source_language = None
+    if FUSE_EXTRACTION_AND_TRANSLATION and language_code and language_code.lower() != 'en':
+        source_language = language_code
+
     try:
         # Call LLM with PydanticOutputParser for structured extraction
         structured_data = llm_gateway.call_for_structured_extraction(
             invoice_text=invoice_text,
             pydantic_schema=InvoiceData,
-            original_filename=filename
+            original_filename=filename,
+            source_language=source_language
         )
         
         if "error" in structured_data:
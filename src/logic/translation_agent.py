@@ -32,6 +32,12 @@ def translate_invoice_data(data: Dict[str, Any], language_code: Optional[str] =
         print(f"\n[TranslationAgent] Skipping translation: Language is already EN.")
         data["translation_confidence"] = 1.0
         return data
+
+    # Only a numeric confidence means extraction really translated the fields
+    fused_conf = data.get("translation_confidence")
+    if isinstance(fused_conf, (int, float)) and not isinstance(fused_conf, bool):
+        print(f"\n[TranslationAgent] Skipping translation: Already translated during extraction.")
+        return data
         
     print(f"\n[TranslationAgent] Starting translation (Language: {language_code or 'unknown'})...")
     confidences = []
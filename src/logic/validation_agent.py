@@ -1,9 +1,18 @@
 import os
 import sys
+import asyncio
+import functools
+import glob
+import hashlib
+import math
+import threading
 import yaml
 import requests
-import json
-from typing import Dict, Any, List
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache, cached
+from typing import Dict, Any, List, Optional, Tuple, FrozenSet
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal, InvalidOperation
 
 # --- Add project root to path ---
@@ -12,37 +21,109 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 try:
-    from config.settings import RULES_PATH, ERP_URL
+    from config.settings import (
+        RULES_PATH, ERP_URL,
+        VALIDATION_CACHE_DIR, VALIDATION_CACHE_SIZE_LIMIT, VALIDATION_CACHE_TTL
+    )
     import litellm
+    import orjson
+    import diskcache
 except ImportError as e:
     print(f"Error importing modules in validation_agent.py: {e}")
     sys.exit(1)
 
 # LOAD YAML RULES
 
-def _load_rules() -> Dict[str, Any]:
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+@functools.lru_cache(maxsize=4)
+def _load_rules(mtime_ns: int) -> Dict[str, Any]:
+    """
+    Parses rules.yaml for a given file mtime. A JSON sidecar
+    (rules.yaml.<mtime>.json) makes later cold starts skip the YAML parse.
+    The returned dict is shared by every caller; treat it as read-only.
+    """
+    sidecar_path = f"{RULES_PATH}.{mtime_ns}.json"
+    try:
+        with open(sidecar_path, 'rb') as f:
+            rules = orjson.loads(f.read())
+        if isinstance(rules, dict):
+            return rules
+    except Exception:
+        pass  # missing or unreadable: rebuild from the YAML
+
     try:
         with open(RULES_PATH, 'r') as f:
-            return yaml.safe_load(f)
+            rules = yaml.load(f, Loader=SafeLoader) or {}
     except Exception as e:
         print(f"[ValidationAgent] CRITICAL: Could not load rules.yaml: {e}")
         return {}
 
-RULES = _load_rules()
+    # Only cache rules that survive a JSON round trip unchanged (no dates, non-str keys, ...).
+    # Written atomically so concurrent readers never see a partial file.
+    try:
+        data = orjson.dumps(rules)
+        if orjson.loads(data) != rules:
+            return rules
+        tmp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, sidecar_path)
+    except (OSError, TypeError) as e:
+        print(f"[ValidationAgent] Could not cache rules.yaml: {e}")
+        return rules
+
+    # Sidecars for older versions of rules.yaml (and old pickle ones) are never read again
+    prefix = glob.escape(str(RULES_PATH))
+    for stale_path in glob.glob(f"{prefix}.*.json") + glob.glob(f"{prefix}.*.pkl"):
+        if stale_path != sidecar_path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+    return rules
+
+def _rules_mtime_ns() -> int:
+    """mtime of rules.yaml, or -1 if it can't be read (_load_rules then reports the error)."""
+    try:
+        return os.stat(RULES_PATH).st_mtime_ns
+    except OSError:
+        return -1
+
+@functools.lru_cache(maxsize=4)
+def _required_fields(mtime_ns: int) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    """Required header fields (in rules.yaml order) and required line item fields."""
+    required = _load_rules(mtime_ns).get("required_fields", {})
+    return tuple(required.get("header", [])), frozenset(required.get("line_item", []))
+
+@functools.lru_cache(maxsize=4)
+def _rules_digest(mtime_ns: int) -> str:
+    """Content hash of the parsed rules; part of the validation cache key."""
+    canonical = orjson.dumps(_load_rules(mtime_ns), option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
 
 def _create_rule_result(rule_name: str, status: str, message: str, source="Internal") -> Dict[str, str]:
     return {"rule_name": rule_name, "status": status, "message": message, "source": source}
 
 # INTERNAL VALIDATION (Stage 1)
 
+# Absorbs float representation error in the financial tolerance checks
+_FLOAT_EPSILON = 1e-9
+
 def _check_internal_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
     print("[ValidationAgent] Running Stage 1: Internal Checks...")
     results = []
+    mtime_ns = _rules_mtime_ns()
+    rules = _load_rules(mtime_ns)
+    header_required, line_item_required = _required_fields(mtime_ns)
 
     # --- 1. Required Header Fields ---
     rule_name = "Required Header Fields"
-    header_rules = RULES.get("required_fields", {}).get("header", [])
-    missing_fields = [field for field in header_rules if not data.get(field)]
+    missing_fields = [field for field in header_required if not data.get(field)]
     
     if missing_fields:
         results.append(_create_rule_result(
@@ -57,12 +138,10 @@ def _check_internal_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
     if "line_items" not in data or not data["line_items"]:
         results.append(_create_rule_result(rule_name, "FAILED", "Invoice has no line items.","Internal"))
     else:
-        missing_item_fields = False
-        for item in data["line_items"]:
-            for field in RULES.get("required_fields", {}).get("line_item", []):
-                if not item.get(field):
-                    missing_item_fields = True
-                    break
+        missing_item_fields = any(
+            line_item_required - {k for k, v in item.items() if v}
+            for item in data["line_items"]
+        )
 
         if missing_item_fields:
             results.append(_create_rule_result(
@@ -78,25 +157,35 @@ def _check_internal_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
     # --- 3. Currency Check ---
     rule_name = "Currency Check"
     currency = data.get("currency")
-    accepted = RULES.get("accepted_currencies", [])
+    accepted = rules.get("accepted_currencies", [])
     if currency not in accepted:
         results.append(_create_rule_result(rule_name, "FAILED", f"Invalid or unaccepted currency: {currency}","Internal"))
     else:
         results.append(_create_rule_result(rule_name, "PASSED", f"Currency '{currency}' is valid.","Internal"))
 
     # --- 4. Financial Checks ---
+    tolerances = rules.get("tolerances", {})
     try:
-        line_sum = sum(Decimal(str(item.get("line_total", 0))) for item in data.get("line_items", []))
-        subtotal = Decimal(str(data.get("subtotal", 0)))
-        tax = Decimal(str(data.get("tax_amount", 0)))
-        total = Decimal(str(data.get("total_amount", 0)))
-        delta = Decimal(str(RULES.get("tolerances", {}).get("financial_rounding_delta", 0.02)))
+        if tolerances.get("strict_decimal", False):
+            # Exact decimal arithmetic (slower)
+            line_sum = sum(Decimal(str(item.get("line_total", 0))) for item in data.get("line_items", []))
+            subtotal = Decimal(str(data.get("subtotal", 0)))
+            tax = Decimal(str(data.get("tax_amount", 0)))
+            total = Decimal(str(data.get("total_amount", 0)))
+            delta = Decimal(str(tolerances.get("financial_rounding_delta", 0.02)))
+        else:
+            # fsum keeps the line sum exact to float precision; epsilon absorbs representation error
+            line_sum = math.fsum(float(item.get("line_total", 0)) for item in data.get("line_items", []))
+            subtotal = float(data.get("subtotal", 0))
+            tax = float(data.get("tax_amount", 0))
+            total = float(data.get("total_amount", 0))
+            delta = float(tolerances.get("financial_rounding_delta", 0.02)) + _FLOAT_EPSILON
 
         # Subtotal
         if abs(line_sum - subtotal) > delta:
             results.append(_create_rule_result(
                 "Subtotal Check", "FAILED",
-                f"Subtotal mismatch. Line sum = {line_sum}, but subtotal = {subtotal}",
+                f"Subtotal mismatch. Line sum = {round(line_sum, 2)}, but subtotal = {subtotal}",
                 "Internal"
             ))
         else:
@@ -106,12 +195,12 @@ def _check_internal_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
         if abs((subtotal + tax) - total) > delta:
             results.append(_create_rule_result(
                 "Total Check", "FAILED",
-                f"Total mismatch. Subtotal+Tax = {subtotal + tax}, but total = {total}","Internal"
+                f"Total mismatch. Subtotal+Tax = {round(subtotal + tax, 2)}, but total = {total}","Internal"
             ))
         else:
             results.append(_create_rule_result("Total Check", "PASSED", "Total is correct.","Internal"))
 
-    except (InvalidOperation, TypeError):
+    except (InvalidOperation, TypeError, ValueError):
         results.append(_create_rule_result(
             "Financial Calculation", "FAILED",
             "Non-numeric values in subtotal/tax/total.","Internal"
@@ -120,28 +209,98 @@ def _check_internal_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
     return results
 
 # ERP VALIDATION (Stage 2)
+
+# Shared pool for ERP lookups: each invoice issues at most 3 (vendor, PO, bulk SKU),
+# so this allows a few invoices' lookups in flight at once
+_ERP_MAX_WORKERS = 8
+_ERP_EXECUTOR = ThreadPoolExecutor(max_workers=_ERP_MAX_WORKERS, thread_name_prefix="erp-lookup")
+
+# Shared keep-alive session: reuses TCP connections to the ERP across requests
+_ERP_SESSION = requests.Session()
+_erp_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+)
+_ERP_SESSION.mount("http://", _erp_adapter)
+_ERP_SESSION.mount("https://", _erp_adapter)
+
+def _erp_get(path: str, params: Dict[str, str] = None) -> requests.Response:
+    return _ERP_SESSION.get(f"{ERP_URL}{path}", params=params, timeout=5)
+
+# TTL caches for ERP records (None = not found in ERP).
+# Errors are raised, so they are never cached.
+_ERP_CACHE_TTL = 300
+_ERP_CACHE_LOCK = threading.Lock()
+_VENDOR_CACHE = TTLCache(maxsize=4096, ttl=_ERP_CACHE_TTL)
+_PO_CACHE = TTLCache(maxsize=4096, ttl=_ERP_CACHE_TTL)
+_SKU_CACHE = TTLCache(maxsize=4096, ttl=_ERP_CACHE_TTL)
+_NOT_CACHED = object()
+
+def _get_erp_record(path: str) -> Optional[Dict[str, Any]]:
+    response = _erp_get(path)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+@cached(_VENDOR_CACHE, lock=_ERP_CACHE_LOCK)
+def _get_vendor(vendor_name: str) -> Optional[Dict[str, Any]]:
+    return _get_erp_record(f"/vendor/by_name/{vendor_name}")
+
+@cached(_PO_CACHE, lock=_ERP_CACHE_LOCK)
+def _get_po(po_number: str) -> Optional[Dict[str, Any]]:
+    return _get_erp_record(f"/po/{po_number}")
+
+def _get_skus(item_codes: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Returns {item_code: sku record or None}.
+    Only codes missing from the cache are fetched, in one bulk request.
+    """
+    skus = {}
+    with _ERP_CACHE_LOCK:
+        for code in item_codes:
+            record = _SKU_CACHE.get(code, _NOT_CACHED)
+            if record is not _NOT_CACHED:
+                skus[code] = record
+    missing = [code for code in item_codes if code not in skus]
+    if missing:
+        response = _erp_get("/sku", {"codes": ",".join(missing)})
+        response.raise_for_status()
+        found = {sku["item_code"]: sku for sku in response.json()}
+        with _ERP_CACHE_LOCK:
+            for code in missing:
+                skus[code] = _SKU_CACHE[code] = found.get(code)
+    return skus
+
 def _check_erp_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
     print("[ValidationAgent] Running Stage 2: ERP Checks...")
     results = []
     po_number = data.get("po_number")
     vendor_name = data.get("vendor_name")
     invoice_currency = data.get("currency")
+    line_items = data.get("line_items", [])
     vendor_id = None
     erp_po = None
 
+    # --- Vendor Check ---
+    rule_name = "ERP Vendor Check"
+    if not vendor_name:
+        results.append(_create_rule_result(rule_name, "FAILED", "Vendor missing.","ERP"))
+        return results
+
     try:
-        # --- Vendor Check ---
-        rule_name = "ERP Vendor Check"
-        if not vendor_name:
-            results.append(_create_rule_result(rule_name, "FAILED", "Vendor missing.","ERP"))
-            return results
-            
-        response = requests.get(f"{ERP_URL}/vendor/by_name/{vendor_name}", timeout=5)
-        if response.status_code == 404:
+        # Vendor, PO and SKU lookups are independent requests: issue them all up front
+        vendor_future = _ERP_EXECUTOR.submit(_get_vendor, vendor_name)
+        po_future = _ERP_EXECUTOR.submit(_get_po, po_number) if po_number else None
+        # All SKUs in one bulk request
+        item_codes = list(dict.fromkeys(item.get("item_id") for item in line_items if item.get("item_id")))
+        sku_future = _ERP_EXECUTOR.submit(_get_skus, item_codes) if item_codes else None
+
+        erp_vendor = vendor_future.result()
+        if erp_vendor is None:
             results.append(_create_rule_result(rule_name, "FAILED", f"Vendor '{vendor_name}' not in ERP.","ERP"))
             return results
-        response.raise_for_status()
-        erp_vendor = response.json()
         vendor_id = erp_vendor.get("vendor_id")
 
         results.append(_create_rule_result(rule_name, "PASSED", f"Vendor '{vendor_name}' exists. ID={vendor_id}","ERP"))
@@ -161,12 +320,10 @@ def _check_erp_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
         if not po_number:
             results.append(_create_rule_result(rule_name, "SKIPPED", "No PO, skipping PO checks.","ERP"))
         else:
-            po_resp = requests.get(f"{ERP_URL}/po/{po_number}", timeout=5)
-            if po_resp.status_code == 404:
+            erp_po = po_future.result()
+            if erp_po is None:
                 results.append(_create_rule_result(rule_name, "FAILED", f"PO '{po_number}' not found.","ERP"))
             else:
-                po_resp.raise_for_status()
-                erp_po = po_resp.json()
                 results.append(_create_rule_result(rule_name, "PASSED", f"PO '{po_number}' is valid.","ERP"))
 
                 # Vendor matches PO
@@ -180,9 +337,12 @@ def _check_erp_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
                     results.append(_create_rule_result(rule_name, "PASSED", "PO vendor matches.","ERP"))
 
         # --- Line Item SKU Checks ---
-        po_map = {item["item_code"]: item for item in erp_po.get("line_items", [])} if erp_po else {}
+        po_codes = {item["item_code"] for item in erp_po.get("line_items", [])} if erp_po else set()
+        erp_skus = sku_future.result() if sku_future else {}
+        # Resolve each unique SKU once; repeated lines reuse the verdict
+        sku_found = {code: bool(erp_skus.get(code)) for code in item_codes}
 
-        for i, item in enumerate(data.get("line_items", [])):
+        for i, item in enumerate(line_items):
             # Map item_id from invoice data to item_code in ERP records
             item_code = item.get("item_id")  # Invoice field
             desc = item.get("description", f"Item {i+1}")
@@ -192,17 +352,15 @@ def _check_erp_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
                 results.append(_create_rule_result(f"{prefix} SKU Check", "FAILED", "Missing SKU.","ERP"))
                 continue
 
-            sku_resp = requests.get(f"{ERP_URL}/sku/{item_code}", timeout=5)
-            if sku_resp.status_code == 404:
+            if not sku_found.get(item_code):
                 results.append(_create_rule_result(
                     f"{prefix} SKU Check", "FAILED", f"SKU '{item_code}' not found in ERP","ERP"
                 ))
                 continue
-            sku_resp.raise_for_status()
             results.append(_create_rule_result(f"{prefix} SKU Check", "PASSED", f"SKU '{item_code}' exists.","ERP"))
 
             if po_number and erp_po:
-                if item_code not in po_map:
+                if item_code not in po_codes:
                     results.append(_create_rule_result(
                         f"{prefix} PO Check", "FAILED", "Item not in PO.","ERP"
                     ))
@@ -216,9 +374,16 @@ def _check_erp_rules(data: Dict[str, Any]) -> List[Dict[str, str]]:
 
 # AI VALIDATION (Stage 3)
 
-def _check_ai_validation(data: Dict[str, Any]) -> List[Dict[str, str]]:
+# Invoice fields sent to the AI checks; extend when adding AI rules that need more
+_AI_RULE_FIELDS = ("vendor_name", "customer_name", "currency", "total_amount")
+
+async def _check_ai_validation(data: Dict[str, Any]) -> List[Dict[str, str]]:
     print("[ValidationAgent] Running Stage 3: AI Checks...")
 
+    # Only the fields the AI rules below look at (smaller prompt = faster, cheaper call)
+    slim = {field: data.get(field) for field in _AI_RULE_FIELDS}
+    slim["line_item_count"] = len(data.get("line_items") or [])
+
     prompt = f"""
     You are an invoice validation checker.
     Return ONLY a JSON list of rule results.
@@ -236,11 +401,15 @@ def _check_ai_validation(data: Dict[str, Any]) -> List[Dict[str, str]]:
     If no issues, return [].
 
     Invoice:
-    {json.dumps(data)}
+    {orjson.dumps(slim).decode()}
     """
 
     try:
-        resp = litellm.completion(
+        # Sync client on a worker thread: validate_invoice_data runs each invoice in a
+        # fresh asyncio.run() loop, and litellm's cached async client stays bound to
+        # the first (closed) loop
+        resp = await asyncio.to_thread(
+            litellm.completion,
             model="bedrock/amazon.nova-lite-v1:0",
             messages=[
                 {"role": "system", "content": "Return ONLY valid JSON. No markdown."},
@@ -253,17 +422,16 @@ def _check_ai_validation(data: Dict[str, Any]) -> List[Dict[str, str]]:
         content = resp.choices[0].message["content"].strip()
 
         # Remove fenced markdown if present
-        if "```" in content:
-            parts = content.split("```")
-            if len(parts) >= 2:
-                content = parts[1].replace("json", "").strip()
+        content = content.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
 
         # Parse JSON
         try:
-            parsed = json.loads(content)
-        except:
+            parsed = orjson.loads(content)
+        except orjson.JSONDecodeError:
             print("[AI Validation] Output not JSON, skipping AI rules.")
-            return []
+            return [_create_rule_result(
+                "AI Validation", "SKIPPED", "AI validation unavailable: model output was not JSON.", "AI"
+            )]
 
         # Handle single dict case
         if isinstance(parsed, dict):
@@ -289,18 +457,81 @@ def _check_ai_validation(data: Dict[str, Any]) -> List[Dict[str, str]]:
 
     except Exception as e:
         print(f"[ValidationAgent] AI validation skipped due to error: {e}")
-        return []
+        return [_create_rule_result("AI Validation", "SKIPPED", f"AI validation unavailable: {e}", "AI")]
+
+def _has_hard_fail(results: List[Dict[str, str]], hard_fail_rules: set) -> bool:
+    return any(r["status"] == "FAILED" and r["rule_name"] in hard_fail_rules for r in results)
+
+async def _run_validation_stages(data: Dict[str, Any]):
+    """
+    Runs the ERP stage and the AI stage (LLM call) concurrently on worker
+    threads; both are network-bound and independent. The AI stage is skipped
+    when the internal or ERP stage already produced a critical failure (see
+    `ai_validation` in rules.yaml).
+    """
+    ai_config = _load_rules(_rules_mtime_ns()).get("ai_validation", {})
+    skip_on_hard_fail = ai_config.get("skip_on_hard_fail", True)
+    hard_fail_rules = set(ai_config.get("hard_fail_rules", []))
+    ai_skipped = [_create_rule_result(
+        "AI Check", "SKIPPED", "Skipped: invoice already has critical failures.", "AI"
+    )]
+
+    # Internal checks are CPU-only and fast; run them first so a hard fail avoids the LLM call
+    internal_results = _check_internal_rules(data)
+    if skip_on_hard_fail and _has_hard_fail(internal_results, hard_fail_rules):
+        erp_results = await asyncio.to_thread(_check_erp_rules, data)
+        return internal_results, erp_results, ai_skipped
+
+    erp_task = asyncio.ensure_future(asyncio.to_thread(_check_erp_rules, data))
+    ai_task = asyncio.ensure_future(_check_ai_validation(data))
+    erp_results = await erp_task
+
+    # Discard the AI results on an ERP hard fail even if they already arrived,
+    # so the outcome (and what gets cached) doesn't depend on which call finished first
+    if skip_on_hard_fail and _has_hard_fail(erp_results, hard_fail_rules):
+        ai_task.cancel()
+        return internal_results, erp_results, ai_skipped
+
+    ai_results = await ai_task
+    return internal_results, erp_results, ai_results
+
+# VALIDATION RESULT CACHE
+
+@functools.cache
+def _validation_cache() -> diskcache.Cache:
+    return diskcache.Cache(str(VALIDATION_CACHE_DIR), size_limit=VALIDATION_CACHE_SIZE_LIMIT)
+
+def _validation_cache_key(invoice_data: Dict[str, Any]) -> Optional[str]:
+    """blake2b of the canonicalized invoice plus the rules hash, or None if not hashable."""
+    try:
+        canonical = orjson.dumps(invoice_data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return None
+    digest = hashlib.blake2b(canonical, digest_size=16)
+    digest.update(_rules_digest(_rules_mtime_ns()).encode())
+    return digest.hexdigest()
 
 # MAIN VALIDATION ENTRY POINT
 def validate_invoice_data(invoice_data: Dict[str, Any]) -> List[Dict[str, str]]:
     print(f"\n[ValidationAgent] Starting validation for: {invoice_data.get('original_filename')}")
 
-    internal_results = _check_internal_rules(invoice_data)
-    erp_results = _check_erp_rules(invoice_data)
-    ai_results = _check_ai_validation(invoice_data)
+    cache_key = _validation_cache_key(invoice_data)
+    if cache_key is not None:
+        cached_results = _validation_cache().get(cache_key)
+        if cached_results is not None:
+            print("[ValidationAgent] Reusing cached results for identical invoice payload.")
+            return cached_results
+
+    internal_results, erp_results, ai_results = asyncio.run(_run_validation_stages(invoice_data))
 
     all_results = internal_results + erp_results + ai_results
 
+    # Don't memoize runs where the ERP or AI stage errored out; a retry may succeed
+    erp_errored = any(r["rule_name"] == "ERP Validation" for r in erp_results)
+    ai_errored = any(r["rule_name"] == "AI Validation" for r in ai_results)
+    if cache_key is not None and not erp_errored and not ai_errored:
+        _validation_cache().set(cache_key, all_results, expire=VALIDATION_CACHE_TTL)
+
     failed = [r for r in all_results if r["status"] == "FAILED"]
     if not failed:
         print(f"[ValidationAgent] Validation PASSED.")
@@ -1,5 +1,6 @@
+import msgspec
 from pydantic import BaseModel, Field
-from typing import List, Optional, Union
+from typing import ClassVar, List, Optional, Union
 from datetime import date
  
 class LineItem(BaseModel):
@@ -12,6 +13,37 @@ class LineItem(BaseModel):
     unit_price: float = Field(..., description="Price per unit of the item")
     line_total: float = Field(..., description="Total price for this line (quantity * unit_price)")
  
+class LineItemStruct(msgspec.Struct, frozen=True, kw_only=True):
+    """
+    Lightweight msgspec mirror of LineItem used on the internal decode path.
+    """
+    item_id: Optional[str]
+    description: Optional[str] = None
+    quantity: float
+    unit_price: float
+    line_total: float
+
+class InvoiceStruct(msgspec.Struct, frozen=True, kw_only=True):
+    """
+    Lightweight msgspec mirror of InvoiceData. Decoding into this skips the
+    per-object Pydantic validation cost; the Pydantic model stays the schema
+    shown to the LLM and the adapter for callers that need it.
+    """
+    invoice_id: Optional[str] = None
+    vendor_name: str
+    customer_name: Optional[str] = None
+    invoice_date: Optional[date] = None
+    due_date: Optional[date] = None
+    subtotal: Optional[float] = None
+    tax_amount: Optional[float] = None
+    discount_amount: Optional[float] = None
+    total_amount: float
+    currency: Optional[str] = "USD"
+    po_number: Optional[str] = None
+    line_items: List[LineItemStruct]
+    original_filename: str
+    processing_status: str = "Pending"
+ 
 class InvoiceData(BaseModel):
     """
     This is the main Pydantic model (data contract) for a fully extracted and
@@ -40,6 +72,14 @@ class InvoiceData(BaseModel):
     # --- Metadata (Added by our process) ---
     original_filename: str = Field(..., description="The name of the source file (e.g., 'invoice_123.pdf')")
     processing_status: str = Field("Pending", description="Current status (e.g., Pending, Extracted, Validated, Failed)")
+
+    # msgspec mirror used for fast decoding (not a model field)
+    struct_type: ClassVar[type] = InvoiceStruct
+
+    @classmethod
+    def from_struct(cls, s: InvoiceStruct) -> "InvoiceData":
+        """Builds the Pydantic model from an already-decoded InvoiceStruct."""
+        return cls.model_validate(s, from_attributes=True)
  
     class Config:
         """Pydantic model configuration."""
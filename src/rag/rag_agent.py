@@ -1,6 +1,7 @@
 import os
 import sys
 import operator
+import re
 from typing import List, TypedDict, Annotated
 
 # --- Add project root to path ---
@@ -9,9 +10,6 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 try:
-    from src.llm.litellm_gateway import setup_aws_credentials
-    setup_aws_credentials()
-
     from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
     from langgraph.graph import StateGraph, END, START
     from langgraph.checkpoint.memory import InMemorySaver
@@ -20,6 +18,7 @@ try:
         search_vector_store,
         get_human_reviewed,
         get_invoices_by_status,
+        get_pending_review,
         get_invoice_by_id,
         explain_rejection,
     )
@@ -30,38 +29,43 @@ except ImportError as e:
     print(f"Error importing modules in rag_chatbot_langgraph.py: {e}")
     sys.exit(1)
 
+# One gateway for all chat turns (reuses its client and connections)
+_RAG_GATEWAY = LLMGateway(model=LLM_RAG_MODEL)
+
 class RAGAgentState(TypedDict):
     user_question: str
     context: str
+    route: str
     answer: str
     chat_history: Annotated[List[BaseMessage], operator.add]
 
 # -------------------------
 # Simple router
 # -------------------------
-def _route(question: str) -> str:
-    q = (question or "").lower()
-
+# First matching entry wins. A route matches if any of its phrases is in the
+# lowercased question; a tuple phrase needs all of its words.
+ROUTE_KEYWORDS = (
     # Human review
-    if "human reviewed" in q or "human-review" in q or "reviewed by human" in q:
-        return "HUMAN_REVIEWED"
-
-    # Why rejected <invoice_id>?
-    if ("why" in q and "reject" in q) or ("why" in q and "rejected" in q):
-        return "WHY_REJECTED"
-
+    ("HUMAN_REVIEWED", ("human reviewed", "human-review", "reviewed by human")),
+    # Why rejected <invoice_id>? ("reject" also covers "rejected")
+    ("WHY_REJECTED", (("why", "reject"),)),
     # Status buckets
-    if "rejected invoices" in q or "show rejected" in q or "list rejected" in q:
-        return "LIST_REJECTED"
-    if "approved invoices" in q or "show approved" in q or "list approved" in q:
-        return "LIST_APPROVED"
-    if "pending review" in q or "under review" in q:
-        return "LIST_PENDING"
-
+    ("LIST_REJECTED", ("rejected invoices", "show rejected", "list rejected")),
+    ("LIST_APPROVED", ("approved invoices", "show approved", "list approved")),
+    ("LIST_PENDING", ("pending review", "under review")),
     # Rules / policy
-    if "validation rules" in q or "what rules" in q or "which rules" in q:
-        return "LIST_RULES"
+    ("LIST_RULES", ("validation rules", "what rules", "which rules")),
+)
+
+# naive extract token like INV_XXX or FAC-XXX
+_INV_ID_RE = re.compile(r'([A-Za-z]+[-_]\d{2,}|\bINV[-_][A-Za-z0-9]+\b|\b[A-Z]{2,}[-_]\d{2,}\b)')
 
+def _route(question: str) -> str:
+    q = (question or "").lower()
+    for route, phrases in ROUTE_KEYWORDS:
+        for phrase in phrases:
+            if all(w in q for w in phrase) if isinstance(phrase, tuple) else phrase in q:
+                return route
     return "RAG_SEARCH"
 
 def _fmt_docs_brief(docs: List) -> str:
@@ -78,45 +82,38 @@ def _fmt_docs_brief(docs: List) -> str:
     return "\n".join(lines)
 
 def _infer_invoice_id(question: str) -> str:
-    # naive extract token like INV_XXX or FAC-XXX
-    import re
-    m = re.search(r'([A-Za-z]+[-_]\d{2,}|\bINV[-_][A-Za-z0-9]+\b|\b[A-Z]{2,}[-_]\d{2,}\b)', question)
+    m = _INV_ID_RE.search(question)
     return m.group(0) if m else ""
 
-def retrieve_documents(state: RAGAgentState)-> RAGAgentState:
-    print("---NODE: Retrieving documents---")
-    question = state['user_question']
-    route = _route(question)
-
+def _retrieve_context(question: str, route: str) -> str:
     # 1) Human reviewed?
     if route == "HUMAN_REVIEWED":
         docs = get_human_reviewed()
         context = _fmt_docs_brief(docs)
-        return {"context": context}
+        return context
 
     # 2) Why rejected <invoice_id>?
     if route == "WHY_REJECTED":
         inv_id = _infer_invoice_id(question)
         if not inv_id:
             # if not found, return a short guidance
-            return {"context": "Please specify an invoice id (e.g., INV_ES_003) to explain rejection."}
+            return "Please specify an invoice id (e.g., INV_ES_003) to explain rejection."
         explanation = explain_rejection(inv_id)
-        return {"context": explanation}
+        return explanation
 
     # 3) Status buckets
     if route == "LIST_REJECTED":
         docs = get_invoices_by_status(["REJECT", "FAILED"])
-        return {"context": _fmt_docs_brief(docs)}
+        return _fmt_docs_brief(docs)
 
     if route == "LIST_APPROVED":
         docs = get_invoices_by_status(["APPROVE", "PASSED"])
-        return {"context": _fmt_docs_brief(docs)}
+        return _fmt_docs_brief(docs)
 
     if route == "LIST_PENDING":
         # PENDING REVIEW invoices: those with status FAILED (pre-human) and no human decision yet
-        # For simplicity, show those with status FAILED and human_decision empty
-        docs = [d for d in get_invoices_by_status(["FAILED"]) if not (d.metadata or {}).get("human_decision")]
-        return {"context": _fmt_docs_brief(docs)}
+        docs = get_pending_review()
+        return _fmt_docs_brief(docs)
 
     # 4) Rules / policy
     if route == "LIST_RULES":
@@ -132,18 +129,34 @@ def retrieve_documents(state: RAGAgentState)-> RAGAgentState:
             "- SKU exists in ERP, qty/price tolerance vs PO\n"
             "- AI anomaly checks: suspicious vendor name, unusual currency, extreme total\n"
         )
-        return {"context": policy}
+        return policy
 
     # 5) Fallback to standard vector search
-    context = search_vector_store(question, top_k=3)
-    return {"context": context}
+    return search_vector_store(question, top_k=3)
+
+def retrieve_documents(state: RAGAgentState)-> RAGAgentState:
+    print("---NODE: Retrieving documents---")
+    question = state['user_question']
+    route = _route(question)
+    context = _retrieve_context(question, route)
+
+    if route != "RAG_SEARCH":
+        # Router answers are already final: return them as the answer, no LLM call
+        return {
+            "context": context,
+            "route": route,
+            "answer": context,
+            "chat_history": [AIMessage(content=context)]
+        }
+    return {"context": context, "route": route}
+
+def _after_retrieval(state: RAGAgentState) -> str:
+    return "generate" if state.get("route") == "RAG_SEARCH" else "skip"
 
 def generate_answer(state: RAGAgentState):
     question = state['user_question']
     context = state['context']
 
-    rag_gateway = LLMGateway(model=LLM_RAG_MODEL)
-
     print(f"[LLMGateway] Generating RAG answer...")        
     messages = [
         {
@@ -157,7 +170,7 @@ def generate_answer(state: RAGAgentState):
         {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"}
     ]        
   
-    answer = rag_gateway._call_llm(messages, temperature=0.1, max_tokens=350)
+    answer = _RAG_GATEWAY._call_llm(messages, temperature=0.1, max_tokens=350)
     print(f"[LLMGateway] ✓ RAG generation successful")
     print("\n--- [RAG Answer] ---")
     print(answer)
@@ -175,7 +188,11 @@ def get_compiled_app():
     workflow.add_node("generate_answer", generate_answer)
 
     workflow.add_edge(START, "retrieve_documents")
-    workflow.add_edge("retrieve_documents", "generate_answer")
+    workflow.add_conditional_edges(
+        "retrieve_documents",
+        _after_retrieval,
+        {"skip": END, "generate": "generate_answer"}
+    )
     workflow.add_edge("generate_answer", END)
 
     memory = InMemorySaver()
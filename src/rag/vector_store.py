@@ -1,10 +1,20 @@
 import os
 import sys
-import json
+import orjson
 import re
+import math
+import time
+import functools
+import atexit
+import shutil
+import sqlite3
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import faiss 
 import numpy as np
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 # --- Add project root to path ---
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -12,10 +22,14 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 try:
-    from config.settings import VECTOR_STORE_DIR, LLM_EMBEDDING_MODEL
+    from config.settings import (
+        VECTOR_STORE_DIR, LLM_EMBEDDING_MODEL, REPORTS_DB_PATH,
+        FAISS_IVF_THRESHOLD, FAISS_IVF_NPROBE, FAISS_IVF_INT8
+    )
     from src.llm.litellm_gateway import LLMGateway
     
     from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
     from langchain_core.documents import Document
     from langchain_core.embeddings import Embeddings
 
@@ -27,6 +41,17 @@ except ImportError as e:
 EMBEDDING_GATEWAY = LLMGateway(model=LLM_EMBEDDING_MODEL)
 FAISS_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, "invoice_faiss_db")
 
+@functools.lru_cache(maxsize=2048)
+def _cached_embed_query(text: str, model: str) -> Tuple[float, ...]:
+    """
+    Query embeddings keyed on (text, model): repeated questions skip the
+    embedding round trip. Failures raise so they are not cached.
+    """
+    vector = EMBEDDING_GATEWAY.get_embedding(text)
+    if not vector:
+        raise RuntimeError("embedding request returned no vector")
+    return tuple(vector)
+
 class LiteLLMEmbeddings(Embeddings):
     """A wrapper that makes LLMGateway compatible with LangChain Embeddings interface."""
     def __init__(self, gateway: LLMGateway):
@@ -34,32 +59,353 @@ class LiteLLMEmbeddings(Embeddings):
 
     def embed_query(self, text: str) -> List[float]:
         try:
-            return self.gateway.get_embedding(text)
+            return list(_cached_embed_query(text, LLM_EMBEDDING_MODEL))
         except Exception as e:
             print(f"[EmbeddingWrapper] Error embedding query: {e}")
             return []
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Batched: EMBEDDING_BATCH_SIZE texts per request, several requests in flight
         try:
-            return [self.gateway.get_embedding(text) for text in texts]
+            return self.gateway.get_embeddings_chunked(texts)
         except Exception as e:
             print(f"[EmbeddingWrapper] Error embedding documents: {e}")
             return []
 
 EMBEDDINGS = LiteLLMEmbeddings(gateway=EMBEDDING_GATEWAY)
 
-def _load_faiss_index() -> Optional[FAISS]:
-    """Loads FAISS index from disk, or returns None if not exists."""
-    if not os.path.exists(FAISS_INDEX_PATH):
+# FAISS OpenMP pool size. Our indexes are small and searched from Streamlit and
+# worker threads, where an all-core pool oversubscribes the CPU. Only the FAISS
+# pool is capped; BLAS/OMP env vars are left to whoever launches the process.
+FAISS_NUM_THREADS = min(4, os.cpu_count() or 1)
+
+
+@functools.cache
+def _configure_faiss_threads():
+    """Caps the FAISS OpenMP pool once, before the first index is built or loaded."""
+    faiss.omp_set_num_threads(FAISS_NUM_THREADS)
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    """float32 copy of the vectors with each row scaled to unit length."""
+    arr = np.array(vectors, dtype='float32', ndmin=2)
+    faiss.normalize_L2(arr)
+    return arr
+
+
+def _unit_text_embeddings(text_embeddings: List[Tuple[str, List[float]]]) -> List[Tuple[str, List[float]]]:
+    vectors = _unit_rows([vector for _, vector in text_embeddings]).tolist()
+    return [(text, vector) for (text, _), vector in zip(text_embeddings, vectors)]
+
+
+def _is_cosine(db: FAISS) -> bool:
+    """True for inner-product indexes, whose vectors (and queries) are unit-normalized."""
+    return db.index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+
+def _new_faiss_index(text_embeddings: List[Tuple[str, List[float]]], metadatas: List[Dict[str, Any]]) -> FAISS:
+    """New index: IndexFlatIP over L2-normalized vectors, i.e. exact cosine search."""
+    _configure_faiss_threads()
+    return FAISS.from_embeddings(
+        _unit_text_embeddings(text_embeddings), EMBEDDINGS, metadatas=metadatas,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+
+
+def _configure_loaded_index(db: FAISS) -> FAISS:
+    """
+    load_local doesn't persist the distance strategy: restore it from the
+    index metric. Indexes built before the switch stay plain L2.
+    """
+    if _is_cosine(db):
+        db.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+    if isinstance(db.index, faiss.IndexIVF):
+        db.index.nprobe = FAISS_IVF_NPROBE
+    return db
+
+
+def _maybe_upgrade_to_ivf(db: FAISS):
+    """
+    Rebuilds a flat index as IVF once it grows past FAISS_IVF_THRESHOLD:
+    IndexIVFScalarQuantizer (int8 codes) with FAISS_IVF_INT8, else IndexIVFFlat.
+    """
+    index = db.index
+    n = index.ntotal
+    if n < FAISS_IVF_THRESHOLD or not isinstance(index, faiss.IndexFlat):
+        return
+    # ~4*sqrt(n) lists, but keep >= 39 training points per list (FAISS minimum)
+    nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+    kind = "IVF-SQ8" if FAISS_IVF_INT8 else "IVF"
+    print(f"[VectorStore] Rebuilding index as {kind} ({n} vectors, nlist={nlist})...")
+    # Positions are kept, so index_to_docstore_id stays valid
+    vectors = index.reconstruct_n(0, n)
+    quantizer = faiss.IndexFlat(index.d, index.metric_type)
+    if FAISS_IVF_INT8:
+        ivf = faiss.IndexIVFScalarQuantizer(
+            quantizer, index.d, nlist, faiss.ScalarQuantizer.QT_8bit, index.metric_type
+        )
+    else:
+        ivf = faiss.IndexIVFFlat(quantizer, index.d, nlist, index.metric_type)
+    ivf.train(vectors)
+    ivf.add(vectors)
+    ivf.nprobe = FAISS_IVF_NPROBE
+    db.index = ivf
+
+
+def _load_faiss_index() -> Tuple[Optional[int], Optional[FAISS]]:
+    """
+    Loads the FAISS index from disk as (mtime, index); (None, None) if none has
+    been saved yet. Raises if an index exists but can't be loaded consistently
+    (e.g. another process is saving it), so callers never mistake it for empty.
+    """
+    mtime = _index_mtime_ns()
+    if mtime is None:
         print("[VectorStore] No FAISS index found. Creating new vector DB.")
+        return None, None
+    _configure_faiss_threads()
+    db = FAISS.load_local(FAISS_INDEX_PATH, EMBEDDINGS, allow_dangerous_deserialization=True)
+    if db.index.ntotal != len(db.index_to_docstore_id) or _index_mtime_ns() != mtime:
+        raise RuntimeError("index changed while loading")
+    print(f"[VectorStore] Loaded FAISS index from {FAISS_INDEX_PATH}")
+    return mtime, _configure_loaded_index(db)
+
+
+def _save_faiss_index(db: FAISS):
+    """
+    Saves into a temp dir next to the index, then moves the files into place
+    with os.replace. The docstore goes first: a reader that sees the new
+    index.faiss also sees the matching index.pkl.
+    """
+    parent = os.path.dirname(FAISS_INDEX_PATH)
+    os.makedirs(FAISS_INDEX_PATH, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".invoice_faiss_db.", dir=parent)
+    try:
+        db.save_local(tmp_dir)
+        for name in ("index.pkl", "index.faiss"):
+            os.replace(os.path.join(tmp_dir, name), os.path.join(FAISS_INDEX_PATH, name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# -------------------------
+# In-memory index + debounced saves
+# -------------------------
+# The index is kept in memory after the first load and written back at most
+# once per debounce window. If another process saves a newer index to disk
+# (the monitor and the review UI both index invoices), it is reloaded and our
+# unsaved adds are replayed on top, so neither side's updates are lost.
+_DB: Optional[FAISS] = None
+_DB_MTIME: Optional[int] = None
+_DB_DIRTY = False
+# (text_embeddings, metadatas) added since the last save, in order
+_DB_PENDING: List[Tuple[List[Tuple[str, List[float]]], List[Dict[str, Any]]]] = []
+_DB_LOCK = threading.RLock()
+_SAVE_DEBOUNCE_SECONDS = 0.5
+_SAVE_RETRY_SECONDS = 5.0  # delay before retrying a save the on-disk index blocked
+# Single background worker for index I/O (prefetch + debounced saves)
+_SAVE_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+_save_scheduled = False
+
+
+def _index_mtime_ns() -> Optional[int]:
+    try:
+        return os.stat(os.path.join(FAISS_INDEX_PATH, "index.faiss")).st_mtime_ns
+    except OSError:
         return None
+
+
+def _add_to_index(db: Optional[FAISS], text_embeddings, metadatas) -> FAISS:
+    """Adds embeddings to db (a new index if db is None) and returns it."""
+    if db is None:
+        return _new_faiss_index(text_embeddings, metadatas=metadatas)
+    if _is_cosine(db):
+        text_embeddings = _unit_text_embeddings(text_embeddings)
+    db.add_embeddings(text_embeddings, metadatas=metadatas)
+    _maybe_upgrade_to_ivf(db)
+    return db
+
+
+def _reload_db() -> bool:
+    """
+    Loads the index from disk and replays the unsaved adds on top. Caller holds
+    _DB_LOCK. If the index can't be loaded, the in-memory one is kept and
+    False is returned.
+    """
+    global _DB, _DB_MTIME
     try:
-        db = FAISS.load_local(FAISS_INDEX_PATH, EMBEDDINGS, allow_dangerous_deserialization=True)
-        print(f"[VectorStore] Loaded FAISS index from {FAISS_INDEX_PATH}")
-        return db
+        mtime, db = _load_faiss_index()
     except Exception as e:
-        print(f"[VectorStore] Could not load FAISS index: {e}.")
-        return None
+        print(f"[VectorStore] Could not load FAISS index: {e}. Keeping the in-memory index.")
+        return False
+    if _DB_PENDING:
+        print(f"[VectorStore] Index changed on disk; re-applying {len(_DB_PENDING)} unsaved batch(es)")
+    for text_embeddings, metadatas in _DB_PENDING:
+        db = _add_to_index(db, text_embeddings, metadatas)
+    _DB, _DB_MTIME = db, mtime
+    return True
+
+
+def _get_db() -> Optional[FAISS]:
+    """Returns the in-memory index, (re)loading it only when the file on disk changed."""
+    global _DB, _DB_MTIME, _PREFETCH_FUTURE
+    with _DB_LOCK:
+        if _DB is None and _PREFETCH_FUTURE is not None:
+            try:
+                _DB_MTIME, _DB = _PREFETCH_FUTURE.result()
+            except Exception:
+                pass  # retried by _reload_db below
+            _PREFETCH_FUTURE = None
+        if _DB is None or _index_mtime_ns() != _DB_MTIME:
+            _reload_db()
+        return _DB
+
+
+def _save_db() -> bool:
+    """Writes pending changes; False if the on-disk index couldn't be merged (nothing written)."""
+    global _DB_MTIME, _DB_DIRTY
+    with _DB_LOCK:
+        if _DB is None or not _DB_DIRTY:
+            return True
+        # Another process saved since we loaded: merge instead of overwriting its adds.
+        # If its index can't be loaded, writing ours would replace the whole history.
+        if _index_mtime_ns() != _DB_MTIME and not _reload_db():
+            print(f"[VectorStore] Not saving: {len(_DB_PENDING)} batch(es) stay pending until the index loads")
+            return False
+        _save_faiss_index(_DB)
+        _DB_MTIME = _index_mtime_ns()
+        _DB_DIRTY = False
+        _DB_PENDING.clear()
+        print(f"[VectorStore] 💾 Saved FAISS index to {FAISS_INDEX_PATH}")
+        return True
+
+
+def _debounced_save(delay: float):
+    global _save_scheduled
+    time.sleep(delay)
+    with _DB_LOCK:
+        _save_scheduled = False
+    try:
+        saved = _save_db()
+    except Exception as e:
+        print(f"[VectorStore] ❌ Failed to save FAISS index: {e}")
+        saved = False
+    if not saved:
+        try:
+            _schedule_save(_SAVE_RETRY_SECONDS)
+        except RuntimeError:
+            pass  # interpreter shutting down; flush_vector_store reports what was lost
+
+
+def _schedule_save(delay: float = _SAVE_DEBOUNCE_SECONDS):
+    """Queues a save; adds arriving within the debounce window share it."""
+    global _save_scheduled
+    with _DB_LOCK:
+        if _save_scheduled:
+            return
+        _save_scheduled = True
+    _SAVE_EXECUTOR.submit(_debounced_save, delay)
+
+
+def flush_vector_store():
+    """Writes any pending index changes to disk immediately (call on shutdown)."""
+    try:
+        if not _save_db():
+            print("[VectorStore] ❌ Unsaved index changes were dropped at shutdown")
+    except Exception as e:
+        print(f"[VectorStore] ❌ Failed to save FAISS index: {e}")
+
+atexit.register(flush_vector_store)
+
+# Start loading the index in the background so the first query doesn't pay for it.
+# Set INVOICE_AUDITOR_PREFETCH_INDEX=0 to disable (e.g. in tests/CI).
+_PREFETCH_FUTURE = None
+if os.getenv("INVOICE_AUDITOR_PREFETCH_INDEX", "1") != "0":
+    _PREFETCH_FUTURE = _SAVE_EXECUTOR.submit(_load_faiss_index)
+
+
+# -------------------------
+# Sidecar report store
+# -------------------------
+# Full report + file metadata JSON live in SQLite keyed by doc_id, so the
+# pickled FAISS docstore only carries the cheap fields used for listing.
+_REPORTS_LOCK = threading.Lock()
+
+
+_REPORT_COLUMNS = {"status": "TEXT", "human_decision": "TEXT", "vendor": "TEXT", "total": "REAL"}
+_reports_backfilled = False
+
+
+@functools.cache
+def _reports_db() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(REPORTS_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(REPORTS_DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS reports("
+        "doc_id TEXT PRIMARY KEY, report_json TEXT, meta_json TEXT)"
+    )
+    # Listing columns (added after the first version of the table)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+    for column, sql_type in _REPORT_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE reports ADD COLUMN {column} {sql_type}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_status ON reports(status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_human_decision ON reports(human_decision)")
+    conn.commit()
+    return conn
+
+
+def _report_row(doc_id: str, metadata: Dict[str, Any]) -> tuple:
+    return (
+        doc_id,
+        (metadata.get("status") or "").upper(),
+        (metadata.get("human_decision") or "").upper(),
+        metadata.get("vendor"),
+        metadata.get("total_amount"),
+    )
+
+
+def _store_reports(entries: List[Tuple[Dict[str, Any], str, str]]):
+    """Upserts (metadata, report_json, meta_json) entries in one transaction."""
+    with _REPORTS_LOCK:
+        conn = _reports_db()
+        conn.executemany(
+            "INSERT OR REPLACE INTO reports(doc_id, status, human_decision, vendor, total, report_json, meta_json) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [_report_row(md["doc_id"], md) + (report_json, meta_json) for md, report_json, meta_json in entries]
+        )
+        conn.commit()
+
+
+def _load_report_json(doc_id: str) -> Optional[str]:
+    with _REPORTS_LOCK:
+        row = _reports_db().execute(
+            "SELECT report_json FROM reports WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def _backfill_reports():
+    """Adds listing rows for documents indexed before the sidecar existed (once per process)."""
+    global _reports_backfilled
+    if _reports_backfilled:
+        return
+    # Newest first, so the most recent document wins for re-indexed invoices
+    rows = [_report_row(d.metadata.get("doc_id"), d.metadata) for d in reversed(_all_docs()) if d.metadata]
+    with _REPORTS_LOCK:
+        conn = _reports_db()
+        conn.executemany(
+            "INSERT OR IGNORE INTO reports(doc_id, status, human_decision, vendor, total) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        # Rows written by the first sidecar version have no listing columns yet
+        conn.executemany(
+            "UPDATE reports SET status = ?, human_decision = ?, vendor = ?, total = ? "
+            "WHERE doc_id = ? AND status IS NULL",
+            [row[1:] + row[:1] for row in rows]
+        )
+        conn.commit()
+    _reports_backfilled = True
 
 
 # Adds readable summary → helps RAG answer why/rejection queries
@@ -68,55 +414,57 @@ def _failed_rules_summary(validation_rules: List[Dict[str, Any]]) -> str:
     return "; ".join(fails) if fails else "None"
 
 
+LINE_FMT = "- {description}: {quantity} x {unit_price} = {line_total}"
+
+
+def _na() -> str:
+    return "N/A"
+
+
 def format_invoice_for_rag(report_data: Dict[str, Any], file_metadata: Dict[str, Any]) -> str:
-    invoice = report_data.get("invoice_data", {})
-    validation_rules_list = report_data.get("validation_rules", [])
-    analysis = report_data.get("ai_analysis", {})
-    overall_status = report_data.get("validation_status", "N/A")
-    translation_conf = report_data.get("translation_confidence")
+    rget = report_data.get
+    invoice = rget("invoice_data", {})
+    iget = invoice.get
+    mget = file_metadata.get
+    analysis = rget("ai_analysis", {})
+    translation_conf = rget("translation_confidence")
 
     lines = [
-        f"Invoice ID: {invoice.get('invoice_id', 'N/A')}",
-        f"Vendor: {invoice.get('vendor_name', 'N/A')}",
-        f"PO Number: {invoice.get('po_number', 'N/A')}",
-        f"Date: {invoice.get('invoice_date', 'N/A')}",
-        f"Total Amount: {invoice.get('total_amount', 0)} {invoice.get('currency', '')}",
-        f"Status: {overall_status}",
+        f"Invoice ID: {iget('invoice_id', 'N/A')}",
+        f"Vendor: {iget('vendor_name', 'N/A')}",
+        f"PO Number: {iget('po_number', 'N/A')}",
+        f"Date: {iget('invoice_date', 'N/A')}",
+        f"Total Amount: {iget('total_amount', 0)} {iget('currency', '')}",
+        f"Status: {rget('validation_status', 'N/A')}",
         "--- Items ---"
     ]
-
-    for item in invoice.get('line_items', []):
-        lines.append(
-            f"- {item.get('description')}: {item.get('quantity')} x {item.get('unit_price')} = {item.get('line_total')}"
-        )
+    lines.extend(LINE_FMT.format_map(defaultdict(_na, item)) for item in iget('line_items') or ())
 
     if translation_conf is not None:
         lines.append(f"Translation Confidence: {round(translation_conf, 3)}")
 
-    lines.extend([
+    lines.extend((
         "\n--- Email & File Information ---",
-        f"Sender Email: {file_metadata.get('sender', 'N/A')}",
-        f"Email Subject: {file_metadata.get('subject', 'N/A')}",
-        f"Received Date: {file_metadata.get('received_timestamp', 'N/A')}",
-    ])
-    
-    lines.extend([
+        f"Sender Email: {mget('sender', 'N/A')}",
+        f"Email Subject: {mget('subject', 'N/A')}",
+        f"Received Date: {mget('received_timestamp', 'N/A')}",
         "\n--- Audit Report ---",
         f"Recommendation: {analysis.get('recommendation', 'N/A')}",
         f"Summary: {analysis.get('analysis', 'N/A')}",
-    ])
-
-    for rule in validation_rules_list:
-        if rule.get('status') == "FAILED":
-            lines.append(f"Validation FAILED: {rule.get('rule_name')} - {rule.get('message')}")
+    ))
+    lines.extend(
+        f"Validation FAILED: {rule.get('rule_name')} - {rule.get('message')}"
+        for rule in rget("validation_rules", [])
+        if rule.get('status') == "FAILED"
+    )
     
-    human_review = report_data.get('human_review')
+    human_review = rget('human_review')
     if human_review and isinstance(human_review, dict):
-        lines.extend([
+        lines.extend((
             "\n--- Human Review ---",
             f"Human Decision: {human_review.get('decision', 'N/A')}",
             f"Feedback: {human_review.get('feedback', 'N/A')}"
-        ])
+        ))
     
     return "\n".join(lines)
 
@@ -139,95 +487,196 @@ def _compact_invoice_summary(report_data: Dict[str, Any]) -> str:
 
 
 # metadata stored (critical for analytics)
+def _build_document(report_data: Dict[str, Any], file_metadata: Dict[str, Any]) -> Document:
+    invoice_data = report_data.get("invoice_data", {})
+    validation_status = report_data.get("validation_status", "UNKNOWN")
+    human_review = report_data.get("human_review") or {}
+
+    doc_id = invoice_data.get('invoice_id', invoice_data.get('original_filename'))
+    if not doc_id:
+        raise ValueError("Report must have invoice_id or original_filename inside invoice_data")
+
+    full_text = format_invoice_for_rag(report_data, file_metadata)
+    summary = _compact_invoice_summary(report_data)
+    failed_rules = _failed_rules_summary(report_data.get("validation_rules", []))
+
+    # ✅ Embedding text = summary + full report improves retrieval quality
+    page_content = summary + "\n\n" + full_text
+
+    return Document(
+        page_content=page_content,
+        metadata={
+            "doc_id": doc_id,
+            "source": invoice_data.get('original_filename', 'N/A'),
+            "vendor": invoice_data.get('vendor_name', 'N/A'),
+            "status": validation_status,
+            "total_amount": invoice_data.get('total_amount', 0),
+            "sender": file_metadata.get('sender', 'N/A'),
+            "translation_confidence": report_data.get("translation_confidence"),
+            "failed_rules_summary": failed_rules,
+            "human_decision": (human_review.get("decision") or "").upper(),
+            "human_feedback": human_review.get("feedback"),
+        }
+    )
+
+
+def add_invoices_to_vector_store(reports: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> int:
+    """
+    Indexes many (report_data, file_metadata) pairs at once: one batched
+    embedding pass, one index insert, one sidecar transaction and one
+    (debounced) save. Returns the number of invoices indexed.
+    """
+    global _DB, _DB_DIRTY
+    docs, sidecar = [], []
+    for report_data, file_metadata in reports:
+        try:
+            doc = _build_document(report_data, file_metadata)
+        except Exception as e:
+            print(f"[VectorStore] ❌ Skipping invoice that can't be indexed. Error: {e}")
+            continue
+        docs.append(doc)
+        sidecar.append((
+            doc.metadata,
+            orjson.dumps(report_data, default=str, option=orjson.OPT_NON_STR_KEYS).decode(),
+            orjson.dumps(file_metadata, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        ))
+    if not docs:
+        return 0
+
+    doc_ids = ", ".join(d.metadata["doc_id"] for d in docs)
+    try:
+        # Embed outside the lock so readers aren't blocked on the network call
+        texts = [d.page_content for d in docs]
+        vectors = EMBEDDINGS.embed_documents(texts)
+        if len(vectors) != len(texts):
+            raise ValueError("Embedding failed")
+
+        text_embeddings = list(zip(texts, vectors))
+        metadatas = [d.metadata for d in docs]
+        with _DB_LOCK:
+            db = _get_db()
+            if db is None:
+                print(f"[VectorStore] Creating new index with documents: {doc_ids}")
+            else:
+                print(f"[VectorStore] Adding documents to existing index: {doc_ids}")
+            _DB = _add_to_index(db, text_embeddings, metadatas)
+            _DB_PENDING.append((text_embeddings, metadatas))
+            _DB_DIRTY = True
+
+        _store_reports(sidecar)
+        _schedule_save()
+        print(f"[VectorStore] ✅ Indexed: {doc_ids}")
+        return len(docs)
+
+    except Exception as e:
+        print(f"[VectorStore] ❌ Failed to index {doc_ids}. Error: {e}")
+        return 0
+
+
 def add_invoice_to_vector_store(
     report_data: Dict[str, Any],
     file_metadata: Dict[str, Any]
 ):
-    doc_id = None
-    try:
-        invoice_data = report_data.get("invoice_data", {})
-        validation_status = report_data.get("validation_status", "UNKNOWN")
-        human_review = report_data.get("human_review") or {}
+    add_invoices_to_vector_store([(report_data, file_metadata)])
 
-        doc_id = invoice_data.get('invoice_id', invoice_data.get('original_filename'))
-        if not doc_id:
-            raise ValueError("Report must have invoice_id or original_filename inside invoice_data")
 
-        full_text = format_invoice_for_rag(report_data, file_metadata)
-        summary = _compact_invoice_summary(report_data)
-        failed_rules = _failed_rules_summary(report_data.get("validation_rules", []))
+# -------------------------
+# ✅ ANALYTICS HELPERS
+# -------------------------
 
-        # ✅ Embedding text = summary + full report improves retrieval quality
-        page_content = summary + "\n\n" + full_text
+def _all_docs() -> List[Document]:
+    return _get_indices()["docs"]
 
-        doc = Document(
-            page_content=page_content,
-            metadata={
-                "doc_id": doc_id,
-                "source": invoice_data.get('original_filename', 'N/A'),
-                "vendor": invoice_data.get('vendor_name', 'N/A'),
-                "status": validation_status,
-                "total_amount": invoice_data.get('total_amount', 0),
-                "sender": file_metadata.get('sender', 'N/A'),
-                "translation_confidence": report_data.get("translation_confidence"),
-                "failed_rules_summary": failed_rules,
-                "human_decision": (human_review.get("decision") or "").upper(),
-                "human_feedback": human_review.get("feedback"),
-                "report_json_str": json.dumps(report_data, default=str),
-                "meta_json_str": json.dumps(file_metadata, default=str)
-            }
-        )
 
-        db = _load_faiss_index()
-        if db is None:
-            print(f"[VectorStore] Creating new index with document: {doc_id}")
-            db = FAISS.from_documents([doc], EMBEDDINGS)
-        else:
-            print(f"[VectorStore] Adding document to existing index: {doc_id}")
-            db.add_documents([doc])
+# Metadata indices over the docstore, rebuilt whenever the index object or
+# its size changes (load from disk or new documents added). Status listings
+# query the sidecar table instead.
+_INDICES: Dict[str, Any] = {"key": None}
 
-        db.save_local(FAISS_INDEX_PATH)
-        print(f"[VectorStore] ✅ Indexed & saved: {doc_id}")
 
-    except Exception as e:
-        print(f"[VectorStore] ❌ Failed to index {doc_id}. Error: {e}")
+def _rebuild_indices(db: Optional[FAISS]) -> Dict[str, Any]:
+    docs = list(db.docstore._dict.values()) if db is not None else []
+    by_id: Dict[str, int] = {}
+    by_human = defaultdict(set)
+    for pos, d in enumerate(docs):
+        md = d.metadata or {}
+        by_id.setdefault(md.get("doc_id"), pos)
+        by_human[(md.get("human_decision") or "").upper()].add(pos)
+    return {"docs": docs, "by_id": by_id, "by_human": by_human}
 
 
-# -------------------------
-# ✅ ANALYTICS HELPERS
-# -------------------------
+def _get_indices() -> Dict[str, Any]:
+    global _INDICES
+    with _DB_LOCK:
+        db = _get_db()
+        key = (id(db), _DB_MTIME, len(db.docstore._dict)) if db is not None else None
+        if _INDICES["key"] != key or "docs" not in _INDICES:
+            _INDICES = {"key": key, **_rebuild_indices(db)}
+        return _INDICES
 
-def _all_docs() -> List[Document]:
-    db = _load_faiss_index()
-    if db is None:
-        return []
-    return list(db.docstore._dict.values())
+
+def _docs_at(indices: Dict[str, Any], positions) -> List[Document]:
+    docs = indices["docs"]
+    return [docs[pos] for pos in sorted(positions)]
 
 
 def get_invoice_by_id(invoice_id: str) -> Optional[Document]:
-    invoice_id = (invoice_id or "").strip()
-    for d in _all_docs():
-        if d.metadata.get("doc_id") == invoice_id:
-            return d
-    return None
+    indices = _get_indices()
+    pos = indices["by_id"].get((invoice_id or "").strip())
+    return indices["docs"][pos] if pos is not None else None
 
 
 def get_invoices_by_status(statuses: List[str]) -> List[Document]:
+    """
+    Latest listing row per invoice whose status or human decision matches,
+    from the indexed sidecar table. Returns lightweight metadata-only Documents.
+    """
     statuses = [s.upper() for s in statuses]
-    out = []
-    for d in _all_docs():
-        md = d.metadata or {}
-        if md.get("status","").upper() in statuses or md.get("human_decision","").upper() in statuses:
-            out.append(d)
-    return out
+    if not statuses:
+        return []
+    _backfill_reports()
+    placeholders = ",".join("?" * len(statuses))
+    with _REPORTS_LOCK:
+        rows = _reports_db().execute(
+            f"SELECT doc_id, vendor, status, human_decision, total FROM reports "
+            f"WHERE status IN ({placeholders}) OR human_decision IN ({placeholders})",
+            statuses + statuses
+        ).fetchall()
+    return _listing_docs(rows)
+
+
+def get_pending_review() -> List[Document]:
+    """Invoices that failed validation and have no human decision yet (one indexed query)."""
+    _backfill_reports()
+    with _REPORTS_LOCK:
+        rows = _reports_db().execute(
+            "SELECT doc_id, vendor, status, human_decision, total FROM reports "
+            "WHERE status = 'FAILED' AND (human_decision IS NULL OR human_decision = '')"
+        ).fetchall()
+    return _listing_docs(rows)
+
+
+def _listing_docs(rows: List[tuple]) -> List[Document]:
+    """Metadata-only Documents for (doc_id, vendor, status, human_decision, total) rows."""
+    return [
+        Document(
+            page_content="",
+            metadata={
+                "doc_id": doc_id,
+                "vendor": vendor,
+                "status": status,
+                "human_decision": human_decision,
+                "total_amount": total,
+            }
+        )
+        for doc_id, vendor, status, human_decision, total in rows
+    ]
 
 
 def get_human_reviewed() -> List[Document]:
-    out = []
-    for d in _all_docs():
-        if (d.metadata or {}).get("human_decision") in ("APPROVE", "REJECT"):
-            out.append(d)
-    return out
+    indices = _get_indices()
+    by_human = indices["by_human"]
+    return _docs_at(indices, by_human.get("APPROVE", set()) | by_human.get("REJECT", set()))
 
 
 def explain_rejection(invoice_id: str) -> str:
@@ -238,7 +687,9 @@ def explain_rejection(invoice_id: str) -> str:
     md = doc.metadata or {}
     report = {}
     try:
-        report = json.loads(md.get("report_json_str") or "{}")
+        # Older indexes still carry the report inline in the metadata
+        report_json = _load_report_json(md.get("doc_id")) or md.get("report_json_str")
+        report = orjson.loads(report_json or "{}")
     except:
         report = {}
 
@@ -266,12 +717,17 @@ def explain_rejection(invoice_id: str) -> str:
 
 
 def search_vector_store(question: str, top_k: int = 3) -> str:
-    db = _load_faiss_index()
+    db = _get_db()
     if db is None:
         return "No information available."
         
     try:
-        results = db.similarity_search(question, k=top_k)
+        query = EMBEDDINGS.embed_query(question)
+        if not query:
+            raise ValueError("Embedding failed")
+        if _is_cosine(db):
+            query = _unit_rows(query)[0].tolist()
+        results = db.similarity_search_by_vector(query, k=top_k)
         if not results:
             return "No information available."
         
@@ -284,3 +740,42 @@ def search_vector_store(question: str, top_k: int = 3) -> str:
     except Exception as e:
         print(f"[VectorStore] FAILED search. Error: {e}")
         return "Error during search."
+
+
+def search_vector_store_batch(questions: List[str], top_k: int = 3) -> List[str]:
+    """
+    search_vector_store for several questions at once: one batched embedding
+    request and one FAISS search over the (n_questions, dim) matrix.
+    """
+    if not questions:
+        return []
+    db = _get_db()
+    if db is None:
+        return ["No information available."] * len(questions)
+
+    try:
+        embs = np.asarray(EMBEDDINGS.embed_documents(questions), dtype='float32')
+        if embs.shape[0] != len(questions):
+            raise ValueError("Embedding failed")
+        with _DB_LOCK:
+            if _is_cosine(db):
+                faiss.normalize_L2(embs)
+            _, ids = db.index.search(embs, top_k)
+            docstore = db.docstore._dict
+            id_map = db.index_to_docstore_id
+            results = [[docstore[id_map[i]] for i in row if i != -1] for row in ids]
+
+        contexts = []
+        for docs in results:
+            if not docs:
+                contexts.append("No information available.")
+                continue
+            contexts.append("\n\n".join(
+                f"--- Context (Invoice: {doc.metadata.get('doc_id','N/A')}) ---\n{doc.page_content}"
+                for doc in docs
+            ))
+        return contexts
+
+    except Exception as e:
+        print(f"[VectorStore] FAILED batch search. Error: {e}")
+        return ["Error during search."] * len(questions)
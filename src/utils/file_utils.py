@@ -1,11 +1,19 @@
 import os
 import sys
+import subprocess
+import tempfile
 import pytesseract
 from PIL import Image
 import pypdf
 import docx
-import json
-from typing import Dict, Any, Optional
+# PDFium (C) text extraction is much faster than pure-Python pypdf; optional
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+import orjson
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
 
 # --- Add project root to path ---
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -13,14 +21,35 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 # --------------------------------
 
+_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tiff")
+# Single-page formats only: a multi-page TIFF adds extra form feeds to the
+# batch output and would shift every later image onto the wrong text
+_BATCH_OCR_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+def _extract_text_from_pdf_pdfium(filepath: str) -> str:
+    """Extracts text from a PDF file with PDFium."""
+    pdf = pdfium.PdfDocument(filepath)
+    try:
+        parts = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            parts.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return "".join(parts)
+    finally:
+        pdf.close()
+
 def _extract_text_from_pdf(filepath: str) -> str:
-    """Extracts text from a PDF file."""
+    """Extracts text from a PDF file (PDFium when installed, else pypdf)."""
+    if pdfium is not None:
+        try:
+            return _extract_text_from_pdf_pdfium(filepath)
+        except Exception as e:
+            print(f"[FileUtils] PDFium failed on {filepath}, falling back to pypdf: {e}")
     try:
         reader = pypdf.PdfReader(filepath)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
+        return "".join(page.extract_text() or "" for page in reader.pages)
     except Exception as e:
         print(f"[FileUtils] Error reading PDF {filepath}: {e}")
         return ""
@@ -36,6 +65,33 @@ def _extract_text_from_image(filepath: str) -> str:
         print("           (Is Tesseract installed? `sudo apt-get install tesseract-ocr`)")
         return ""
 
+def _extract_text_from_images(filepaths: List[str]) -> Dict[str, str]:
+    """
+    OCRs several images with a single tesseract process: the images are
+    listed in a manifest file and tesseract separates their text with form
+    feeds. Falls back to one call per image if the batch run fails.
+    """
+    manifest_path = None
+    try:
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as manifest:
+            manifest.write("\n".join(os.path.abspath(p) for p in filepaths) + "\n")
+            manifest_path = manifest.name
+        result = subprocess.run(
+            [pytesseract.pytesseract.tesseract_cmd, manifest_path, "-"],
+            capture_output=True, text=True, check=True
+        )
+        # One form feed after each image: exactly len(filepaths) texts plus an empty tail
+        pages = result.stdout.split("\f")
+        if len(pages) == len(filepaths) + 1 and not pages[-1].strip():
+            return dict(zip(filepaths, pages))
+        print(f"[FileUtils] Batch OCR returned {len(pages)} pages for {len(filepaths)} images, retrying one by one")
+    except Exception as e:
+        print(f"[FileUtils] Batch OCR failed, retrying one by one: {e}")
+    finally:
+        if manifest_path:
+            os.remove(manifest_path)
+    return {p: _extract_text_from_image(p) for p in filepaths}
+
 def _extract_text_from_docx(filepath: str) -> str:
     """Extracts text from a DOCX file."""
     try:
@@ -59,7 +115,7 @@ def get_file_content(filepath: str) -> str:
     
     if file_ext == ".pdf":
         text = _extract_text_from_pdf(filepath)
-    elif file_ext in [".png", ".jpg", ".jpeg", ".tiff"]:
+    elif file_ext in _IMAGE_EXTENSIONS:
         text = _extract_text_from_image(filepath)
     elif file_ext == ".docx":
         text = _extract_text_from_docx(filepath)
@@ -70,6 +126,25 @@ def get_file_content(filepath: str) -> str:
     print(f"[FileUtils] Extracted {len(text)} chars from {filename}")
     return text
 
+def get_file_contents(filepaths: List[str]) -> Dict[str, str]:
+    """
+    Bulk version of get_file_content: returns {filepath: text}.
+    Single-page images are OCR'd together in one tesseract run instead of one
+    process each; TIFFs and anything else go through get_file_content.
+    """
+    image_paths = [p for p in filepaths if os.path.splitext(p)[1].lower() in _BATCH_OCR_EXTENSIONS]
+    contents = _extract_text_from_images(image_paths) if len(image_paths) > 1 else {}
+    for filepath in filepaths:
+        if filepath not in contents:
+            contents[filepath] = get_file_content(filepath)
+    return contents
+
+@lru_cache(maxsize=512)
+def _read_meta(meta_filepath: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parsed .meta.json, cached per (path, mtime) so re-reads skip the file."""
+    with open(meta_filepath, 'rb') as f:
+        return orjson.loads(f.read())
+
 def read_metadata_file(invoice_filepath: str) -> Optional[Dict[str, Any]]:
     """
     Finds and reads the corresponding .meta.json file for an invoice.
@@ -79,15 +154,17 @@ def read_metadata_file(invoice_filepath: str) -> Optional[Dict[str, Any]]:
     base_name = os.path.splitext(invoice_filepath)[0]
     meta_filepath = f"{base_name}.meta.json"
     
-    if not os.path.exists(meta_filepath):
+    try:
+        mtime_ns = os.stat(meta_filepath).st_mtime_ns
+    except OSError:
         print(f"[FileUtils] Warning: No metadata file found at: {meta_filepath}")
         return None
         
     try:
-        with open(meta_filepath, 'r') as f:
-            metadata = json.load(f)
+        # Copy so callers can't modify the cached dict
+        metadata = dict(_read_meta(meta_filepath, mtime_ns))
         print(f"[FileUtils] Successfully read metadata from: {os.path.basename(meta_filepath)}")
         return metadata
     except Exception as e:
         print(f"[FileUtils] Error reading metadata file {meta_filepath}: {e}")
-        return None
\ No newline at end of file
+        return None
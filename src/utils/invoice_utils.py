@@ -1,7 +1,9 @@
-import json
 import os
 import sys
+import functools
 from pathlib import Path
+from types import MappingProxyType
+import orjson
 import streamlit as st
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -10,13 +12,15 @@ if project_root not in sys.path:
     
 from config import settings
 
+@functools.lru_cache(maxsize=1)
 def get_directory_structure():
-    return {
+    # Read-only: the cached mapping is shared by every caller
+    return MappingProxyType({
         "auto_processed": settings.PROCESSED_DIR,
         "pending_review": settings.REVIEW_DIR,
         "approved": settings.APPROVED_DIR,
         "rejected": settings.REJECTED_DIR
-    }
+    })
 
 def get_invoice_count_in_subdirs(directory: Path):
     if not directory.exists():
@@ -66,26 +70,24 @@ def get_pending_invoices():
 
         if meta_file.exists():
             try:
-                with open(meta_file, "r") as f:
-                    invoice_data["metadata"] = json.load(f)
+                invoice_data["metadata"] = orjson.loads(meta_file.read_bytes())
             except:
                 pass
 
         if report_file.exists():
             try:
-                with open(report_file, "r") as f:
-                    report = json.load(f)
-                    invoice_data["report"] = report
-
-                    inv_data = report.get("invoice_data", {})
-                    invoice_data["vendor"] = inv_data.get("vendor_name", "Unknown")
-                    invoice_data["amount"] = inv_data.get("total_amount", "N/A")
-                    invoice_data["date"] = inv_data.get("invoice_date", "Unknown")
-                    invoice_data["status"] = report.get("validation_status", "Pending Review")
-
-                    rules = report.get("validation_rules", [])
-                    failed = [r.get("message") for r in rules if r.get("status") == "FAILED"]
-                    invoice_data["issues"] = failed
+                report = orjson.loads(report_file.read_bytes())
+                invoice_data["report"] = report
+
+                inv_data = report.get("invoice_data", {})
+                invoice_data["vendor"] = inv_data.get("vendor_name", "Unknown")
+                invoice_data["amount"] = inv_data.get("total_amount", "N/A")
+                invoice_data["date"] = inv_data.get("invoice_date", "Unknown")
+                invoice_data["status"] = report.get("validation_status", "Pending Review")
+
+                rules = report.get("validation_rules", [])
+                failed = [r.get("message") for r in rules if r.get("status") == "FAILED"]
+                invoice_data["issues"] = failed
             except:
                 pass
 
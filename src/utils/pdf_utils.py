@@ -1,6 +1,21 @@
 import base64
+import io
+from pathlib import Path
 import streamlit as st
 
+# Multiple of 3, so each chunk base64-encodes without padding
+_B64_CHUNK_SIZE = 48 * 1024
+
+
+def _pdf_data_url(pdf_path: Path) -> str:
+    """Base64 data URL, encoded in chunks instead of reading the whole file first."""
+    buf = io.BytesIO()
+    with open(pdf_path, "rb") as f:
+        while chunk := f.read(_B64_CHUNK_SIZE):
+            buf.write(base64.b64encode(chunk))
+    return "data:application/pdf;base64," + buf.getvalue().decode('ascii')
+
+
 def display_pdf(pdf_path):
     if not pdf_path or not pdf_path.exists():
         st.warning("Invoice file not found.")
@@ -12,11 +27,11 @@ def display_pdf(pdf_path):
         st.image(str(pdf_path), use_column_width=True)
 
     elif ext == '.pdf':
-        with open(pdf_path, "rb") as f:
-            base64_pdf = base64.b64encode(f.read()).decode('utf-8')
+        # Inlined per session: invoices must not be reachable at a public static URL
+        src = _pdf_data_url(pdf_path)
 
         pdf_display = f"""
-        <iframe src="data:application/pdf;base64,{base64_pdf}"
+        <iframe src="{src}"
         width="100%" height="800" type="application/pdf"></iframe>
         """
         st.markdown(pdf_display, unsafe_allow_html=True)
@@ -1,9 +1,92 @@
-import json
+import orjson
+import queue
+import atexit
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 
 LOG_FILE = Path("pipeline_history.jsonl")
 
+# Events are queued and appended by a background writer in batches, so the
+# pipeline never blocks on the log file
+_Q: "queue.Queue[dict]" = queue.Queue()
+_BATCH_MAX = 128
+_BATCH_TIMEOUT = 0.5  # seconds to wait for the first event of a batch
+_FLUSH_TIMEOUT = 5.0  # max seconds flush_log (and interpreter exit) waits for the writer
+_writer_lock = threading.Lock()
+_writer_thread = None
+
+
+def _drain(max_items: int, timeout: float) -> list:
+    """Blocks up to `timeout` for one event, then takes whatever else is queued."""
+    try:
+        batch = [_Q.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while len(batch) < max_items:
+        try:
+            batch.append(_Q.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _writer():
+    try:
+        f = open(LOG_FILE, "ab")
+    except OSError as e:
+        # Keep consuming (and discarding) events so flush_log never waits on them
+        print(f"[PipelineLogger] Cannot open {LOG_FILE}, events will be dropped: {e}")
+        f = None
+    try:
+        while True:
+            batch = _drain(_BATCH_MAX, _BATCH_TIMEOUT)
+            if not batch:
+                continue
+            try:
+                if f is not None:
+                    f.write(b"".join(orjson.dumps(e) + b"\n" for e in batch))
+                    f.flush()
+            except Exception as e:
+                print(f"[PipelineLogger] Failed to write {len(batch)} events: {e}")
+            finally:
+                for _ in batch:
+                    _Q.task_done()
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _ensure_writer():
+    global _writer_thread
+    if _writer_thread is not None:
+        return
+    with _writer_lock:
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_writer, name="pipeline-log-writer", daemon=True)
+            _writer_thread.start()
+
+
+def flush_log(timeout: float = _FLUSH_TIMEOUT) -> bool:
+    """
+    Waits up to `timeout` seconds for every queued event to be written.
+    Returns False if events were still pending (timeout or writer thread gone).
+    """
+    deadline = time.monotonic() + timeout
+    with _Q.all_tasks_done:
+        while _Q.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if _writer_thread is None or not _writer_thread.is_alive() or remaining <= 0:
+                print(f"[PipelineLogger] {_Q.unfinished_tasks} events not written to {LOG_FILE}")
+                return False
+            # Short waits so a writer that dies mid-flush is noticed
+            _Q.all_tasks_done.wait(min(remaining, 0.1))
+    return True
+
+atexit.register(flush_log)
+
+
 def log_event(invoice_id: str, stage: str, status: str = "completed", message: str = ""):
     event = {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -13,6 +96,6 @@ def log_event(invoice_id: str, stage: str, status: str = "completed", message: s
         "message": message
     }
 
-    # Append as JSONL line
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(event) + "\n")
+    # Appended as a JSONL line by the background writer
+    _ensure_writer()
+    _Q.put(event)
@@ -1,34 +1,41 @@
-import streamlit as st
-import os
-import sys
+import time
+import traceback
 
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
-    
-try:
-    from src.graph.review_workflow import review_app
-except:
-    review_app = None
 
 def process_human_decision(invoice_id, decision, feedback):
-    if review_app is None:
+    # Imported on first use: the review graph pulls in langgraph and the LLM
+    # clients, which pages importing this module shouldn't pay for up front
+    import streamlit as st
+    try:
+        from src.graph.review_workflow import review_app
+    except (ImportError, SystemExit) as e:
+        # The workflow modules sys.exit() when a dependency fails to import
+        print(f"[ReviewUtils] Review workflow unavailable: {e!r}")
         st.error("Review workflow unavailable.")
         return False
 
+    start_ns = time.perf_counter_ns()
     try:
         result = review_app.invoke({
             "invoice_id": invoice_id,
             "human_decision": decision,
             "human_feedback": feedback
         })
-
-        if result.get("error"):
-            st.error(result["error"])
-            return False
-
-        return True
-
+    except (TimeoutError, RuntimeError) as e:
+        print(f"[ReviewUtils] Review workflow failed for {invoice_id}: {e!r}")
+        st.error(f"Workflow error: {e}")
+        return False
     except Exception as e:
+        # Anything else is a bug in the graph; keep the trace instead of hiding it
+        traceback.print_exc()
         st.error(f"Workflow error: {e}")
         return False
+    finally:
+        elapsed_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+        print(f"[ReviewUtils] Review workflow for {invoice_id} took {elapsed_ms} ms")
+
+    if result.get("error"):
+        st.error(result["error"])
+        return False
+
+    return True
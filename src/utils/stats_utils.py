@@ -1,26 +1,132 @@
-from .invoice_utils import get_directory_structure, get_invoice_count_in_subdirs
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Set, Tuple
 
-def refresh_invoice_counts():
+from .invoice_utils import get_directory_structure
+
+_COUNTED_DIRS = ("auto_processed", "pending_review", "approved", "rejected")
+
+@dataclass(slots=True, frozen=True)
+class InvoiceCounts:
+    """Dashboard counters returned by refresh_invoice_counts (rates are percentages)."""
+    auto_processed: int
+    pending_review: int
+    approved: int
+    rejected: int
+    total_received: int
+    successfully_processed: int
+    acceptance_rate: float
+    auto_processing_rate: float
+
+def _is_ignored(name: str) -> bool:
+    """Hidden/system entries and partial (.tmp) directories aren't invoices."""
+    return name[0] == '.' or name.endswith('.tmp')
+
+def _count_invoices(root: str) -> int:
+    """
+    Number of invoice directories (one per invoice) directly under root.
+    DirEntry.is_dir() uses the type from the directory listing, so unlike
+    Path.iterdir() + is_dir() there is no stat call per entry.
+    """
+    try:
+        with os.scandir(root) as it:
+            return sum(1 for e in it if not _is_ignored(e.name) and e.is_dir())
+    except FileNotFoundError:
+        return 0
+
+def _locate_buckets(dirs: Mapping[str, Path]) -> Dict[str, str]:
+    """
+    {bucket: path} for the report directories that exist. They normally share
+    one parent (reports/), so a single listing of it answers existence for all
+    four; otherwise each is checked on its own.
+    """
+    parents = {dirs[k].parent for k in _COUNTED_DIRS}
+    if len(parents) != 1:
+        return {k: str(dirs[k]) for k in _COUNTED_DIRS if os.path.isdir(dirs[k])}
+
+    key_by_name = {dirs[k].name: k for k in _COUNTED_DIRS}
+    found = {}
+    try:
+        with os.scandir(parents.pop()) as it:
+            for e in it:
+                key = key_by_name.get(e.name)
+                if key is not None and e.is_dir():
+                    found[key] = e.path
+    except FileNotFoundError:
+        pass
+    return found
+
+# (bucket mtimes, counts) from the last scan. Adding or moving an invoice
+# directory changes its bucket's mtime, so equal mtimes mean equal counts.
+_counts_cache: Optional[Tuple[tuple, InvoiceCounts]] = None
+
+def _bucket_mtimes(dirs: Mapping[str, Path]) -> tuple:
+    mtimes = []
+    for k in _COUNTED_DIRS:
+        try:
+            mtimes.append(os.stat(dirs[k]).st_mtime_ns)
+        except FileNotFoundError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+# Report directories created by init() in this process
+_ensured_dirs: Set[Path] = set()
+
+def init():
+    """Creates the report directories once per process (call at app startup)."""
+    for path in get_directory_structure().values():
+        if path not in _ensured_dirs:
+            os.makedirs(path, exist_ok=True)
+            _ensured_dirs.add(path)
+
+def reset_cache():
+    """Forget cached directory state (call after deleting or moving report directories)."""
+    global _counts_cache
+    _counts_cache = None
+    _ensured_dirs.clear()
+    get_directory_structure.cache_clear()
+
+def refresh_invoice_counts() -> InvoiceCounts:
+    global _counts_cache
     dirs = get_directory_structure()
-    for path in dirs.values():
-        path.mkdir(parents=True, exist_ok=True)
+    mtimes = _bucket_mtimes(dirs)
+    if _counts_cache is not None and _counts_cache[0] == mtimes and None not in mtimes:
+        return _counts_cache[1]
+
+    # Count-only: directories are created by init(); a missing bucket has no invoices.
+    # mtimes are taken before counting, so a concurrent change forces a recount.
+    found = _locate_buckets(dirs)
+    counts = dict.fromkeys(_COUNTED_DIRS, 0)
 
-    counts = {
-        "auto_processed": get_invoice_count_in_subdirs(dirs["auto_processed"]),
-        "pending_review": get_invoice_count_in_subdirs(dirs["pending_review"]),
-        "approved": get_invoice_count_in_subdirs(dirs["approved"]),
-        "rejected": get_invoice_count_in_subdirs(dirs["rejected"]),
-    }
+    # The directory scans are independent and I/O-bound: run them concurrently
+    if found:
+        with ThreadPoolExecutor(max_workers=len(found)) as ex:
+            futs = {k: ex.submit(_count_invoices, path) for k, path in found.items()}
+            counts.update((k, f.result()) for k, f in futs.items())
 
-    total = sum(counts.values())
-    counts["total_received"] = total
-    counts["successfully_processed"] = counts["auto_processed"] + counts["approved"]
+    auto, pending, approved, rejected = (counts[k] for k in _COUNTED_DIRS)
+    total = auto + pending + approved + rejected
+    successfully_processed = auto + approved
 
+    # Percentages rounded half-up to one decimal (what the dashboard shows) in integer arithmetic
     if total > 0:
-        counts["acceptance_rate"] = (counts["successfully_processed"] / total) * 100
-        counts["auto_processing_rate"] = (counts["auto_processed"] / total) * 100
+        acceptance_rate = (successfully_processed * 2000 + total) // (2 * total) / 10
+        auto_processing_rate = (auto * 2000 + total) // (2 * total) / 10
     else:
-        counts["acceptance_rate"] = 0
-        counts["auto_processing_rate"] = 0
+        acceptance_rate = 0.0
+        auto_processing_rate = 0.0
 
-    return counts
+    result = InvoiceCounts(
+        auto_processed=auto,
+        pending_review=pending,
+        approved=approved,
+        rejected=rejected,
+        total_received=total,
+        successfully_processed=successfully_processed,
+        acceptance_rate=acceptance_rate,
+        auto_processing_rate=auto_processing_rate,
+    )
+    _counts_cache = (mtimes, result)
+    return result